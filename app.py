@@ -1,29 +1,59 @@
+import functools
 import locale
-from datetime import date
+import logging
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable
 
 import pandas as pd
+from plotly.graph_objects import Figure, FigureWidget
+from shiny import reactive, req
 from shiny.express import input, render, ui
+from shiny.types import SafeException, SilentException
 from shinywidgets import render_plotly
 
+from cube import term_keys
+from metrics import output_scope, phase, timed, timed_output, track_session
 from plot_utils import (
     avance_fig,
+    avance_table,
     comparativa_fig,
+    FigureSpec,
+    figure_cache,
+    figure_spec,
     figure_text,
+    mean_cols,
     mean_fig,
+    mean_table,
+    patch_figure,
     satisfaccion_fig,
+    to_widget,
 )
 from shared import (
     tipo_col,
+    PooledTasks,
+    band_types,
     course_to_date,
     courses_df,
+    current_version,
     data,
+    dataset_choices,
     filter_options,
-    filter_data,
-    get_objectives,
     type_options,
     last_entry_ds,
-    select_choices,
-    logger,
+    load_filtered,
+    load_objectives,
+    period_keys,
+    versioned,
+    view_key,
+)
+from warmup import warmup
+
+logging.basicConfig(
+    level=logging.INFO,  # muestra mensajes de nivel INFO o superior
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
 )
 
 # Idioma local castellano para trabajar con strftime y fechas, _ para no renderizar
@@ -31,16 +61,361 @@ _ = locale.setlocale(locale.LC_TIME, "")
 actual_trim, actual_course = last_entry_ds(date.today())
 
 ui.page_opts(window_title="Rendimiento Escuela", fillable=True)
+track_session()
+# La primera ejecución, al arrancar, precarga en segundo plano la vista inicial
+warmup.start()
+
+
+@reactive.calc
+def category_choices() -> list[str]:
+    """ Obtiene las opciones del desplegable de selección para la categoría elegida. """
+    return dataset_choices(input.category())
+
+
+class Query:
+    """ Filtros de la barra lateral aplicados a las tarjetas, que cambian todos a la vez. """
+
+    fields = ("trim_start", "course_start", "category", "selected", "tipo", "normalize")
+
+    def __init__(self, delay: float, manual: bool = False):
+        self.delay = delay
+        self.manual = manual
+        # Un valor reactivo por filtro: cada tarjeta solo se invalida por los que lee
+        self._values = {field: reactive.value() for field in self.fields}
+        self._pending: dict | None = None
+        self._changed_at = 0.0
+        self._applied = False
+
+    def __getattr__(self, field: str) -> Callable[[], Any]:
+        if field not in Query.fields:
+            raise AttributeError(field)
+        value = self._values[field]
+
+        def read() -> Any:
+            try:
+                return value()
+            except SilentException:
+                # Hasta que se aplican los primeros filtros, los outputs siguen cargando
+                req(False, cancel_output="progress")
+
+        return read
+
+    def _read(self) -> dict:
+        return {field: input[field]() for field in self.fields}
+
+    def _ready(self, values: dict) -> bool:
+        # Al cambiar la categoría, la selección anterior sigue llegando hasta que
+        # se actualiza el desplegable: no se aplica una combinación incoherente.
+        # Sin aislar: si el dataset aún se está cargando, se comprueba de nuevo al terminar
+        try:
+            return values["selected"] in category_choices()
+        except SafeException:
+            # Sin dataset no hay opciones: se aplican para que las tarjetas muestren el error
+            return True
+
+    def _apply(self, values: dict) -> None:
+        with reactive.isolate():
+            for field, value in values.items():
+                current = self._values[field]
+                if not current.is_set() or current() != value:
+                    current.set(value)
+        self._applied = True
+
+    def follow(self) -> None:
+        """ Aplica los filtros tras una pausa en los cambios o, en modo manual, al pulsar Aplicar. """
+
+        @reactive.effect
+        def _():
+            values = self._read()
+            now = time.monotonic()
+            if values != self._pending:
+                self._pending, self._changed_at = values, now
+            if not self._ready(values):
+                return
+            # Los primeros filtros se aplican sin esperar para no retrasar la carga
+            if not self._applied:
+                self._apply(values)
+                return
+            if self.manual:
+                return
+            remaining = self.delay - (now - self._changed_at)
+            if remaining > 0:
+                reactive.invalidate_later(remaining)
+                return
+            self._apply(values)
+
+        if self.manual:
+
+            @reactive.effect
+            @reactive.event(input.apply)
+            def _():
+                with reactive.isolate():
+                    values = self._read()
+                    if self._ready(values):
+                        self._apply(values)
+
+
+# Pausa, en segundos, tras el último cambio de los filtros antes de recalcular las
+# tarjetas: una ráfaga de cambios produce una única actualización
+query_debounce_secs = 0.3
+# Modo manual (DASHBOARD_MANUAL_APPLY=1): los filtros solo se aplican al pulsar el
+# botón "Aplicar"
+manual_apply = os.environ.get("DASHBOARD_MANUAL_APPLY") == "1"
+
+query = Query(query_debounce_secs, manual_apply)
+query.follow()
+
+
+# Cálculos de las tarjetas de la sesión. Se hacen en el pool de hilos del proceso,
+# fuera del bucle de eventos, y unos filtros nuevos cancelan los de los anteriores
+tasks = PooledTasks()
+
+
+def query_key(*fields: str) -> tuple:
+    """ Obtiene los valores de los filtros indicados junto con la versión del dataset. """
+    data()  # Dependencia para repetir los cálculos al cambiar el dataset
+    return (current_version(), date.today(), *(getattr(query, field)() for field in fields))
+
+
+def query_start() -> datetime:
+    """ Obtiene la fecha de inicio del periodo seleccionado. """
+    return course_to_date(query.trim_start(), query.course_start())
+
+
+# Tablas de las tarjetas. En el pool no hay contexto reactivo: reciben los filtros ya leídos
+@timed("aggregation")
+def selection_tables(
+    start: datetime, category: str, selected: str
+) -> dict[str, pd.DataFrame] | None:
+    """ Filtra el cubo por el periodo y la categoría y calcula las tablas de las tarjetas. """
+    # Las tarjetas solo agrupan por curso, trimestre y nivel
+    df = load_filtered(start, category, selected, by=term_keys)
+    if df is None:
+        return None
+    # Agregados comunes a las vistas con y sin objetivo: cambiar "Diferencia con
+    # Objetivo" no vuelve a agregar el cubo
+    return {"filtered": df, "means": mean_table(df, mean_cols), "avance": avance_table(df)}
+
+
+@timed("aggregation")
+def band_table(start: datetime, category: str, selected: str) -> pd.DataFrame | None:
+    """ Obtiene por curso y trimestre la proporción de alumnos de tercer año que ya han accedido a la banda. """
+    df = load_filtered(start, category, selected, by=term_keys, band=True)
+    if df is None:
+        return None
+    return mean_table(df, ["Acceso_Banda"])
+
+
+@timed("aggregation")
+def period_table(start: datetime, category: str, band: bool = False) -> pd.DataFrame | None:
+    """ Obtiene el cubo filtrado por el periodo seleccionado, o con band el del acceso a la banda. """
+    # La comparativa agrupa además por la categoría elegida
+    return load_filtered(start, by=period_keys(category), band=band)
+
+
+# Cada cálculo devuelve también la versión del dataset de la que parte: la clave de
+# la figura debe ser la de los datos con que se crea, no la que haya al leerla
+@reactive.calc
+def objectives() -> tuple[int, dict[str, float] | None]:
+    """ Obtiene los objetivos de la versión actual del dataset. """
+    return tasks("objetivos", query_key(), versioned, load_objectives, date.today())
+
+
+@reactive.calc
+def selection() -> tuple[int, dict[str, pd.DataFrame] | None]:
+    """ Obtiene las tablas del periodo y la categoría seleccionados. """
+    key = query_key("trim_start", "course_start", "category", "selected")
+    return tasks(
+        "seleccion",
+        key,
+        versioned,
+        selection_tables,
+        query_start(),
+        query.category(),
+        query.selected(),
+    )
+
+
+def filtered() -> tuple[int, pd.DataFrame | None]:
+    """ Obtiene el cubo filtrado por el periodo y la categoría seleccionados. """
+    version, tables = selection()
+    return version, None if tables is None else tables["filtered"]
+
+
+def means() -> tuple[int, pd.DataFrame | None]:
+    """ Obtiene las medias por curso y trimestre de las métricas de las tarjetas. """
+    version, tables = selection()
+    return version, None if tables is None else tables["means"]
+
+
+def avance() -> tuple[int, pd.DataFrame | None]:
+    """ Obtiene el avance a estudios profesionales de los alumnos de cuarto. """
+    version, tables = selection()
+    return version, None if tables is None else tables["avance"]
+
+
+@reactive.calc
+def band_access() -> tuple[int, pd.DataFrame | None]:
+    """ Obtiene la proporción de alumnos de tercer año que ya han accedido a la banda. """
+    key = query_key("trim_start", "course_start", "category", "selected")
+    return tasks(
+        "banda", key, versioned, band_table, query_start(), query.category(), query.selected()
+    )
+
+
+@reactive.calc
+def filtered_period() -> tuple[int, pd.DataFrame | None]:
+    """ Obtiene el cubo filtrado por el periodo seleccionado. """
+    key = query_key("trim_start", "course_start", "category")
+    return tasks("periodo", key, versioned, period_table, query_start(), query.category())
+
+
+@reactive.calc
+def band_period() -> tuple[int, pd.DataFrame | None]:
+    """ Obtiene el cubo del acceso a la banda filtrado por el periodo seleccionado. """
+    key = query_key("trim_start", "course_start", "category")
+    return tasks(
+        "periodo_banda", key, versioned, period_table, query_start(), query.category(), True
+    )
+
+
+def figure_key(
+    chart: str,
+    versions: tuple[int, int] | None = None,
+    tipo: str | None = None,
+    normalize: bool = False,
+) -> tuple:
+    """ Obtiene la clave de la caché de figuras para una tarjeta con los filtros actuales,
+    creada con las tablas y los objetivos de las versiones indicadas o, sin ellas, de la actual. """
+    if versions is None:
+        version = query_key()[0]
+        versions = (version, version)
+    # La diferencia con el objetivo es otra figura, con el nombre que le da export.py
+    return view_key(
+        f"{chart}_diferencia" if normalize else chart,
+        query.trim_start(),
+        query.course_start(),
+        query.category(),
+        query.selected(),
+        versions,
+        tipo,
+    )
+
+
+def card_figure(
+    chart: str,
+    tables: Callable[[], tuple],
+    draw: Callable[..., Figure],
+    tipo: str | None = None,
+    normalize: bool = False,
+) -> FigureSpec:
+    """ Obtiene la figura de una tarjeta. tables lee de los cálculos de la sesión las versiones
+    de sus datos y los argumentos de draw, que crea la figura en el pool de hilos. """
+    # Una vista repetida se sirve de la caché sin agregar el cubo ni crear la figura
+    spec = figure_cache.get(figure_key(chart, tipo=tipo, normalize=normalize))
+    if spec is not None:
+        return spec
+    versions, *args = tables()
+    if any(arg is None for arg in args):
+        return figure_spec(figure_text("Cargando..."))
+    # La figura se guarda con la versión de sus datos, no con la que haya al leerla
+    key = figure_key(chart, versions, tipo, normalize)
+    return tasks(chart, key, figure_cache.build, key, functools.partial(draw, *args))
+
+
+def objective_tables(
+    table: Callable[[], tuple[int, pd.DataFrame | None]],
+) -> Callable[[], tuple]:
+    """ Obtiene las tablas de una tarjeta con objetivo: una tabla de la sesión y los objetivos. """
+
+    def tables() -> tuple:
+        objective_version, objective = objectives()
+        version, df = table()
+        return (version, objective_version), df, objective
+
+    return tables
+
+
+# Modo de actualización en su sitio: cada tarjeta mantiene su FigureWidget y, al
+# cambiar los filtros, solo se envían al navegador los datos de las trazas
+in_place_updates = True
+
+
+class LiveCard:
+    """ Figura de una tarjeta que se mantiene viva y se actualiza en su sitio. """
+
+    def __init__(self, figure: Callable[[], FigureSpec]):
+        self.figure = figure
+        self.output_id: str | None = None
+        self.rendered = False
+        self._rebuild = reactive.value(0)
+
+    def visible(self) -> bool:
+        """ Indica si la tarjeta está a la vista. Si el navegador no lo informa, lo está. """
+        if self.output_id is None:
+            return True
+        key = f"{self.output_id}_visible"
+        return input[key]() if key in input else True
+
+    def render(self) -> FigureWidget:
+        """ Construye la figura inicial, que solo se rehace si no admite la actualización. """
+        if not in_place_updates:
+            # Oculta, la tarjeta conserva la figura anterior hasta que vuelva a verse
+            req(self.visible(), cancel_output=True)
+            spec = self.figure()
+            with phase("serialize"):
+                return to_widget(spec)
+        self._rebuild()
+        with reactive.isolate():
+            spec = self.figure()
+        # El widget se crea fuera de isolate: shinywidgets lo cierra cuando se
+        # invalida el contexto en el que se creó
+        with phase("serialize"):
+            widget = to_widget(spec)
+        self.rendered = True
+        return widget
+
+    def follow(self, output) -> None:
+        """ Actualiza la figura mostrada por el output cada vez que cambian sus datos. """
+        self.output_id = output.output_id
+        if not in_place_updates:
+            return
+
+        @reactive.effect
+        def _():
+            # Oculta, la tarjeta no depende de los filtros: queda pendiente y se
+            # actualiza al volver a verse
+            if not self.visible():
+                return
+            # Las actualizaciones en su sitio se miden como el propio output
+            with output_scope(output.output_id):
+                try:
+                    spec = self.figure()
+                except SafeException:
+                    # Un error en un efecto cerraría la sesión: lo muestra el render
+                    with reactive.isolate():
+                        self._rebuild.set(self._rebuild() + 1)
+                    return
+                with reactive.isolate():
+                    # Si el render inicial esperaba a la figura, aún no hay widget
+                    # que actualizar y se vuelve a hacer con la figura ya creada
+                    patched = False
+                    if self.rendered:
+                        widget = output.widget
+                        with phase("serialize"):
+                            patched = patch_figure(widget, spec)
+                    if not patched:
+                        self._rebuild.set(self._rebuild() + 1)
 
 
 # Barra de título
 @render.express
 def render_title():
     with ui.layout_columns(class_="mt-1 mb-0", col_widths=[8, 4]):
-        title = f"Escuela de Música - {input.category()}"
-        sel = input.selected()
+        title = f"Escuela de Música - {query.category()}"
+        sel = query.selected()
         if sel != "General":
-            title = f"{title}: {input.selected()}"
+            title = f"{title}: {sel}"
         ui.h2(title)
         ui.div(
             ui.p(
@@ -62,6 +437,7 @@ with ui.sidebar():
 
     # Curso inicio de la comparativa. Por defecto es el último
     @render.ui
+    @timed_output
     def select_course_start():
         return ui.input_select(
             "course_start",
@@ -81,11 +457,12 @@ with ui.sidebar():
     ui.input_select("category", "Categoría", choices=filter_options, selected="General")
 
     @render.ui
+    @timed_output
     def input_sel_filter():
         return ui.input_select(
             "selected",
             "Seleccionar",
-            choices=select_choices(data(), input.category()),
+            choices=category_choices(),
         )
 
     ui.input_select(
@@ -96,6 +473,7 @@ with ui.sidebar():
     )
 
     @render.ui
+    @timed_output
     def error_msg():
         if input.course_start() == actual_course and actual_trim < int(
             input.trim_start()
@@ -107,87 +485,89 @@ with ui.sidebar():
 
     ui.input_checkbox("normalize", "Diferencia con Objetivo")
 
+    if manual_apply:
+        ui.input_action_button("apply", "Aplicar")
+
 
 # Fila 1
 with ui.layout_columns(height=300):
     with ui.card(full_screen=True):
         ui.card_header("Tasa de aprobados")
 
+        def aproved_figure():
+            normalize = query.normalize()
+
+            def draw(df: pd.DataFrame, objective: dict[str, float]) -> Figure:
+                return mean_fig(
+                    df,
+                    objective["Aprobado"],
+                    "Aprobado",
+                    "Promedio de Aprobado",
+                    normalize=normalize,
+                )
+
+            return card_figure("aprobado", objective_tables(means), draw, normalize=normalize)
+
+        aproved_card = LiveCard(aproved_figure)
+
         @render_plotly
+        @timed_output
         def aproved_plotly():
-            objective = get_objectives()
-            if objective is None:
-                return figure_text("Cargando...")
-            objective = objective["Aprobado"]
-            df = filter_data(
-                data(),
-                date=course_to_date(input.trim_start(), input.course_start()),
-                category=input.category(),
-                selected=input.selected(),
-            )
-            if df is None:
-                return figure_text("Cargando...")
-            logger.debug(df)
-            fig = mean_fig(
-                df,
-                objective,
-                "Aprobado",
-                "Promedio de Aprobado",
-                normalize=input.normalize(),
-            )
-            return fig
+            return aproved_card.render()
+
+        aproved_card.follow(aproved_plotly)
 
     with ui.card(full_screen=True):
         ui.card_header("Horas de práctica semanales")
 
+        def horas_practica_figure():
+            normalize = query.normalize()
+
+            def draw(df: pd.DataFrame, objective: dict[str, float]) -> Figure:
+                return mean_fig(
+                    df,
+                    objective["Horas_Practica"],
+                    "Horas_Practica",
+                    "Horas de Práctica Semanales",
+                    normalize=normalize,
+                )
+
+            return card_figure("horas_practica", objective_tables(means), draw, normalize=normalize)
+
+        horas_practica_card = LiveCard(horas_practica_figure)
+
         @render_plotly()
+        @timed_output
         def horas_practica_plotly():
-            objective = get_objectives()
-            if objective is None:
-                return figure_text("Cargando...")
-            objective = objective["Horas_Practica"]
-            df = filter_data(
-                data(),
-                date=course_to_date(input.trim_start(), input.course_start()),
-                category=input.category(),
-                selected=input.selected(),
-            )
-            if df is None:
-                return figure_text("Cargando...")
-            fig = mean_fig(
-                df,
-                objective,
-                "Horas_Practica",
-                "Horas de Práctica Semanales",
-                normalize=input.normalize(),
-            )
-            return fig
+            return horas_practica_card.render()
+
+        horas_practica_card.follow(horas_practica_plotly)
 
     with ui.card(full_screen=True):
         ui.card_header("Promedio de asistencia")
 
+        def asistencia_figure():
+            normalize = query.normalize()
+
+            def draw(df: pd.DataFrame, objective: dict[str, float]) -> Figure:
+                return mean_fig(
+                    df,
+                    objective["Promedio_Asistencia"],
+                    "Promedio_Asistencia",
+                    "Promedio de Asistencia",
+                    normalize=normalize,
+                )
+
+            return card_figure("asistencia", objective_tables(means), draw, normalize=normalize)
+
+        asistencia_card = LiveCard(asistencia_figure)
+
         @render_plotly()
+        @timed_output
         def asistencia_plotly():
-            objective = get_objectives()
-            if objective is None:
-                return figure_text("Cargando...")
-            objective = objective["Promedio_Asistencia"]
-            df = filter_data(
-                data(),
-                date=course_to_date(input.trim_start(), input.course_start()),
-                category=input.category(),
-                selected=input.selected(),
-            )
-            if df is None:
-                return figure_text("Cargando...")
-            fig = mean_fig(
-                df,
-                objective,
-                "Promedio_Asistencia",
-                "Promedio de Asistencia",
-                normalize=input.normalize(),
-            )
-            return fig
+            return asistencia_card.render()
+
+        asistencia_card.follow(asistencia_plotly)
 
 
 # Fila 2
@@ -195,81 +575,78 @@ with ui.layout_columns(height=300):
     with ui.card(full_screen=True):
         ui.card_header("Acceden a la Banda en 3 años")
 
+        def acceso_banda_figure():
+            normalize = query.normalize()
+
+            def draw(df: pd.DataFrame, objective: dict[str, float]) -> Figure:
+                return mean_fig(
+                    df,
+                    objective["Banda"],
+                    "Acceso_Banda",
+                    "Proporción que Accede a Banda",
+                    normalize=normalize,
+                )
+
+            return card_figure(
+                "acceso_banda", objective_tables(band_access), draw, normalize=normalize
+            )
+
+        acceso_banda_card = LiveCard(acceso_banda_figure)
+
         @render_plotly
+        @timed_output
         def acceso_banda_plotly():
-            df = data()
-            df = df[df["Años_Inscrito"] == 3]
-            objective = get_objectives()
-            if objective is None:
-                return figure_text("Cargando...")
-            objective = objective["Banda"]
-            df = filter_data(
-                data(),
-                date=course_to_date(input.trim_start(), input.course_start()),
-                category=input.category(),
-                selected=input.selected(),
-            )
-            if df is None:
-                return figure_text("Cargando...")
-            fig = mean_fig(
-                df,
-                objective,
-                "Banda",
-                "Proporción que Accede a Banda",
-                normalize=input.normalize(),
-            )
-            return fig
+            return acceso_banda_card.render()
+
+        acceso_banda_card.follow(acceso_banda_plotly)
 
     with ui.card(full_screen=True):
         ui.card_header("Abandonan la escuela")
 
+        def abandono_figure():
+            normalize = query.normalize()
+
+            def draw(df: pd.DataFrame, objective: dict[str, float]) -> Figure:
+                return mean_fig(
+                    df,
+                    objective["Abandono_Educacion"],
+                    "Abandono_Educacion",
+                    "Proporción de Alumnos Totales",
+                    normalize=normalize,
+                )
+
+            return card_figure("abandono", objective_tables(means), draw, normalize=normalize)
+
+        abandono_card = LiveCard(abandono_figure)
+
         @render_plotly
+        @timed_output
         def abandono_plotly():
-            objective = get_objectives()
-            if objective is None:
-                return figure_text("Cargando...")
-            objective = objective["Abandono_Educacion"]
-            df = filter_data(
-                data(),
-                date=course_to_date(input.trim_start(), input.course_start()),
-                category=input.category(),
-                selected=input.selected(),
-            )
-            if df is None:
-                return figure_text("Cargando...")
-            fig = mean_fig(
-                df,
-                objective,
-                "Abandono_Educacion",
-                "Proporción de Alumnos Totales",
-                normalize=input.normalize(),
-            )
-            return fig
+            return abandono_card.render()
+
+        abandono_card.follow(abandono_plotly)
 
     with ui.card(full_screen=True):
         ui.card_header("Avanzan a estudios profesionales")
 
+        def avance_estudios_figure():
+            normalize = query.normalize()
+
+            def draw(df: pd.DataFrame, objective: dict[str, float]) -> Figure:
+                return avance_fig(df, objective["Avance_Grado_Profesional"], normalize=normalize)
+
+            return card_figure(
+                "avance_estudios", objective_tables(avance), draw, normalize=normalize
+            )
+
+        avance_estudios_card = LiveCard(avance_estudios_figure)
+
         @render_plotly
+        @timed_output
         def avance_estudios_plotly():
-            df: pd.DataFrame | None = filter_data(
-                data(),
-                date=course_to_date(input.trim_start(), input.course_start()),
-                category=input.category(),
-                selected=input.selected(),
-            )
-            if df is None:
-                return figure_text("Cargando...")
-            df = df[df["Curso"] == "Cuarto"]  # type: ignore
-            objective = get_objectives()
-            if objective is None or df is None:
-                return figure_text("Cargando...")
-            objective = objective["Avance_Grado_Profesional"]
-            fig = avance_fig(
-                df,
-                objective,
-                normalize=input.normalize(),
-            )
-            return fig
+            return avance_estudios_card.render()
+
+        avance_estudios_card.follow(avance_estudios_plotly)
 
 
 # Fila 2
@@ -277,46 +654,49 @@ with ui.layout_columns(col_widths=[8, 4], height=300):
     with ui.card(full_screen=True):
         ui.card_header("Comparativa")
 
+        def comparativa_figure():
+            tipo_graf = query.tipo()
+            categoria, seleccion = query.category(), query.selected()
+            period = band_period if tipo_graf in band_types else filtered_period
+
+            def draw(df: pd.DataFrame, objective: dict[str, float]) -> Figure:
+                return comparativa_fig(
+                    df,
+                    objective=objective[tipo_col[tipo_graf]],
+                    categoria=categoria,
+                    seleccion=seleccion,
+                    tipo_graf=tipo_graf,
+                )
+
+            return card_figure("comparativa", objective_tables(period), draw, tipo=tipo_graf)
+
+        comparativa_card = LiveCard(comparativa_figure)
+
         @render_plotly
+        @timed_output
         def comparativa_plotly():
-            df = filter_data(
-                data(),
-                date=course_to_date(input.trim_start(), input.course_start()),
-            )
-            if df is None:
-                return figure_text("Cargando...")
-            tipo_graf = input.tipo()
-            objective = get_objectives()
-            if objective is None or df is None:
-                return figure_text("Cargando...")
-            fig = comparativa_fig(
-                df,
-                objective=objective[tipo_col[tipo_graf]],
-                categoria=input.category(),
-                seleccion=input.selected(),
-                tipo_graf=tipo_graf,
-            )
-            return fig
+            return comparativa_card.render()
+
+        comparativa_card.follow(comparativa_plotly)
 
     with ui.card(full_screen=True):
         ui.card_header("Índice de Satisfacción")
 
+        def satisfaccion_figure():
+            def draw(df: pd.DataFrame, objective: dict[str, float]) -> Figure:
+                return satisfaccion_fig(df, objective["Satisfaccion"])
+
+            return card_figure("satisfaccion", objective_tables(filtered), draw)
+
+        satisfaccion_card = LiveCard(satisfaccion_figure)
+
         @render_plotly
+        @timed_output
         def satisfaccion_plotly():
-            objective = get_objectives()
-            if objective is None:
-                return figure_text("Cargando...")
-            objective = objective["Satisfaccion"]
-            df = filter_data(
-                data(),
-                date=course_to_date(input.trim_start(), input.course_start()),
-                category=input.category(),
-                selected=input.selected(),
-            )
-            if df is None:
-                return figure_text("Cargando...")
-            fig = satisfaccion_fig(
-                df,
-                objective,
-            )
-            return fig
+            return satisfaccion_card.render()
+
+        satisfaccion_card.follow(satisfaccion_plotly)
+
+
+# Informa de las tarjetas a la vista para recalcular solo esas
+ui.include_js(Path(__file__).parent / "visibility.js", method="inline")
@@ -0,0 +1,329 @@
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from chart_data import comparativa_series
+from cohort import band_cube, build_cohorts
+from cube import term_cube
+from data_gen_v2 import generar_alumnos_vectorizado, nombres_profesores
+from plot_utils import (
+    avance_fig,
+    avance_table,
+    comparativa_fig,
+    mean_cols,
+    mean_fig,
+    mean_table,
+    satisfaccion_fig,
+)
+from shared import (
+    DatasetCache,
+    band_types,
+    build_cube_index,
+    calculate_objective,
+    compute_objectives,
+    filter_data,
+    filter_options,
+    map_objective,
+    read_dataset,
+    select_choices,
+    tipo_col,
+    type_options,
+)
+from snapshot import write_snapshot
+
+app_dir = Path(__file__).parent
+data_dir = app_dir / "benchmark_data"
+results_path = app_dir / "benchmark_results.json"
+# Baseline de esta máquina: los tiempos de otra no son comparables y no se sube
+baseline_path = app_dir / "benchmark_baseline.json"
+
+default_rows = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Margen sobre la baseline a partir del cual una medida se considera regresión,
+# y diferencia mínima en ms para no marcar ruido en las medidas muy rápidas
+regression_ratio = 1.5
+regression_min_ms = 2.0
+
+
+def dataset_files(rows: int, seed: int, formats: list[str]) -> tuple[Path, Path]:
+    """ Genera, si no existe ya, un dataset sintético con el número de filas indicado. """
+    csv_path = data_dir / f"dataset_{rows}_{seed}.csv"
+    snap_path = data_dir / f"dataset_{rows}_{seed}.snapshot"
+    missing = ("csv" in formats and not csv_path.exists()) or not snap_path.exists()
+    if not missing:
+        return csv_path, snap_path
+    data_dir.mkdir(parents=True, exist_ok=True)
+    nombres = nombres_profesores(seed)
+    # Cada alumno ocupa varias filas: se generan bloques hasta cubrir las filas pedidas
+    bloques, total, inicio, i = [], 0, 1, 0
+    while total < rows:
+        n = max(1_000, (rows - total) // 5)
+        df = generar_alumnos_vectorizado(inicio, n, seed=(seed, i), nombres=nombres)
+        bloques.append(df)
+        total += len(df)
+        inicio += n
+        i += 1
+    df = pd.concat(bloques, ignore_index=True).head(rows)
+    # El snapshot se escribe el último para que, como en la aplicación, sea el
+    # más reciente y data() lo prefiera al CSV
+    if "csv" in formats:
+        df.to_csv(csv_path, index=False)
+    write_snapshot(df, snap_path)
+    return csv_path, snap_path
+
+
+def measure(fn: Callable[[], object], repeat: int) -> dict[str, float]:
+    """ Mide el tiempo de una función en varias repeticiones, tras una de calentamiento. """
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": min(times),
+        "mediana_ms": statistics.median(times),
+        "max_ms": max(times),
+    }
+
+
+def import_profile(module: str, repeat: int, top: int = 15) -> dict:
+    """ Mide con python -X importtime la importación de un módulo en procesos nuevos. """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=app_dir, capture_output=True, text=True, check=True,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        total, modules = 0, {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            own, cumulative, name = line.removeprefix("import time:").split("|")
+            total += int(own)
+            modules[name.strip()] = int(cumulative) / 1000
+        runs.append((total / 1000, elapsed, modules))
+    # La ejecución más rápida es la menos afectada por la carga de la máquina
+    total, elapsed, modules = min(runs, key=lambda run: run[0])
+    heaviest = sorted(modules.items(), key=lambda item: -item[1])[:top]
+    return {
+        "modulo": module,
+        "total_ms": total,
+        "mediana_ms": statistics.median(run[0] for run in runs),
+        "proceso_ms": elapsed,
+        "modulos_ms": dict(heaviest),
+    }
+
+
+def run_size(rows: int, seed: int, repeat: int, formats: list[str]) -> dict:
+    """ Mide los caminos críticos de carga, filtrado, objetivos y gráficas para un tamaño. """
+    csv_path, snap_path = dataset_files(rows, seed, formats)
+    timings: dict[str, dict[str, float]] = {}
+
+    def bench(name: str, fn: Callable[[], object]) -> None:
+        timings[name] = measure(fn, repeat)
+        t = timings[name]
+        print(f"  {name:<60} {t['min_ms']:>10.2f} ms (mediana {t['mediana_ms']:.2f})", flush=True)
+
+    print(f"{rows} filas")
+    # Carga: cada medida parte de una caché vacía, como el primer acceso a data()
+    if "csv" in formats:
+        bench("carga/csv", lambda: read_dataset(csv_path))
+    bench("carga/snapshot", lambda: read_dataset(snap_path))
+    csv_source = csv_path if "csv" in formats else data_dir / "no_existe.csv"
+    bench("carga/data", lambda: DatasetCache(csv_source, snap_path).get())
+
+    df = read_dataset(snap_path)
+    bench("cubo", lambda: build_cube_index(df))
+    index = build_cube_index(df)
+    cube = index.frame
+    band = band_cube(df, build_cohorts(df))
+    del df
+
+    # Desde el primer trimestre: el filtrado devuelve todo el histórico
+    start = datetime(cube["Fecha"].min().year, 12, 1)
+    for category in filter_options:
+        selected = select_choices(cube, category)[-1]
+        bench(
+            f"filter_data/{category}",
+            lambda: filter_data(cube, start, category, selected, index=index),
+        )
+        bench(
+            f"filter_data/{category}/sin_indice",
+            lambda: filter_data(cube, start, category, selected),
+        )
+
+    terms = term_cube(cube)
+    reference = date.today()
+    bench("objetivos", lambda: compute_objectives(reference, terms=terms))
+    period = filter_data(terms, start)
+    for col, obj in map_objective.items():
+        bench(
+            f"calculate_objective/{col}",
+            lambda: calculate_objective(obj, period, col),  # type: ignore
+        )
+    objectives = compute_objectives(reference, terms=terms)
+    if objectives is None:
+        raise RuntimeError("No hay datos suficientes para calcular los objetivos")
+
+    data = filter_data(cube, start, index=index)
+    bench("mean_table", lambda: mean_table(data, mean_cols))
+    means = mean_table(data, mean_cols)
+    for col in mean_cols:
+        bench(f"mean_fig/{col}", lambda: mean_fig(means, objectives[col], col))
+    bench(
+        "satisfaccion_fig",
+        lambda: satisfaccion_fig(data, objectives["Satisfaccion"]),
+    )
+    bench("avance_table", lambda: avance_table(data))
+    avance = avance_table(data)
+    bench(
+        "avance_fig",
+        lambda: avance_fig(avance, objectives["Avance_Grado_Profesional"]),
+    )
+
+    band_data = filter_data(band, start)
+    for category in filter_options:
+        selected = select_choices(cube, category)[-1]
+        for tipo in type_options:
+            col = tipo_col[tipo]
+            source = band_data if tipo in band_types else data
+            if category != "General":
+                bench(
+                    f"comparativa_series/{category}/{col}",
+                    lambda: comparativa_series(source, category, tipo),
+                )
+            bench(
+                f"comparativa_fig/{category}/{col}",
+                lambda: comparativa_fig(source, objectives[col], category, selected, tipo),
+            )
+    return {"filas": rows, "tiempos": timings}
+
+
+def compare(
+    results: dict, baseline: dict, ratio: float = regression_ratio
+) -> list[dict]:
+    """ Compara los mínimos con los de la baseline y devuelve las regresiones. """
+    regressions = []
+    for size, current in results["resultados"].items():
+        base = baseline["resultados"].get(size)
+        if base is None:
+            continue
+        for name, timing in current["tiempos"].items():
+            if name not in base["tiempos"]:
+                continue
+            # El mínimo es la medida menos sensible a la carga de la máquina
+            before = base["tiempos"][name]["min_ms"]
+            after = timing["min_ms"]
+            if after > before * ratio and after - before > regression_min_ms:
+                regressions.append({
+                    "filas": int(size),
+                    "medida": name,
+                    "baseline_ms": before,
+                    "actual_ms": after,
+                    "ratio": after / before if before else float("inf"),
+                })
+    return regressions
+
+
+def print_comparison(results: dict, baseline: dict) -> None:
+    """ Muestra cada medida junto a su valor en la baseline. """
+    for size, current in results["resultados"].items():
+        base = baseline["resultados"].get(size, {}).get("tiempos", {})
+        print(f"{size} filas")
+        for name, timing in current["tiempos"].items():
+            after = timing["min_ms"]
+            if name not in base:
+                print(f"  {name:<60} {after:>10.2f} ms  (nueva)")
+                continue
+            before = base[name]["min_ms"]
+            ratio = after / before if before else float("inf")
+            print(f"  {name:<60} {before:>10.2f} -> {after:>10.2f} ms  x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mide la carga, el filtrado, los objetivos y las gráficas del dashboard"
+    )
+    parser.add_argument("--filas", type=int, nargs="+", default=default_rows)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument(
+        "--formatos", choices=["csv", "snapshot"], nargs="+", default=["csv", "snapshot"],
+        help="Formatos del dataset cuya carga se mide",
+    )
+    parser.add_argument("--salida", type=Path, default=results_path)
+    parser.add_argument("--baseline", type=Path, default=baseline_path)
+    parser.add_argument(
+        "--umbral", type=float, default=regression_ratio,
+        help="Ratio sobre la baseline a partir del cual una medida es una regresión",
+    )
+    parser.add_argument(
+        "--importacion", nargs="?", const="server", metavar="MODULO",
+        help="Mide solo la importación del módulo (por defecto server) con -X importtime",
+    )
+    parser.add_argument(
+        "--guardar-baseline", action="store_true",
+        help="Guarda los resultados como nueva baseline",
+    )
+    args = parser.parse_args()
+    # Los mensajes de carga del dataset se mezclarían con las medidas
+    logging.getLogger("shared").setLevel(logging.WARNING)
+
+    results = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "pandas": pd.__version__,
+        "seed": args.seed,
+        "repeticiones": args.repeticiones,
+        "resultados": {},
+    }
+    if args.importacion:
+        profile = import_profile(args.importacion, args.repeticiones)
+        results["importacion"] = profile
+        print(
+            f"import {profile['modulo']}: {profile['total_ms']:.0f} ms "
+            f"(mediana {profile['mediana_ms']:.0f}, proceso {profile['proceso_ms']:.0f} ms)"
+        )
+        for name, ms in profile["modulos_ms"].items():
+            print(f"  {name:<60} {ms:>10.2f} ms")
+    else:
+        for rows in args.filas:
+            results["resultados"][str(rows)] = run_size(
+                rows, args.seed, args.repeticiones, args.formatos
+            )
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Resultados escritos en {args.salida}")
+
+    if args.guardar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Baseline guardada en {args.baseline}")
+    elif args.baseline.exists():
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print_comparison(results, baseline)
+        regressions = compare(results, baseline, args.umbral)
+        for r in regressions:
+            print(
+                f"Regresión en {r['medida']} con {r['filas']} filas: "
+                f"{r['baseline_ms']:.2f} -> {r['actual_ms']:.2f} ms (x{r['ratio']:.2f})"
+            )
+        if regressions:
+            sys.exit(1)
+    else:
+        print(f"No hay baseline en {args.baseline}: se guarda con --guardar-baseline")
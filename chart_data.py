@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from cube import satisfaccion_levels
+from metrics import timed
+from shared import band_types, tipo_col
+
+# Datos de las gráficas, calculados con operaciones vectorizadas sobre las sumas y
+# los recuentos del cubo de métricas. Cada traza es un diccionario con su nombre y
+# sus arrays: x, y y, si la gráfica los usa, text (etiquetas) y hover (valor del hover)
+
+# Columnas de la gráfica de avance, en el orden de sus barras
+avance_cols = ["Pruebas_Grado_Profesional", "Avance_Grado_Profesional"]
+
+
+def group_codes(keys: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """ Obtiene el grupo de cada fila y el valor de cada grupo, en el orden de las categorías. """
+    # Las claves del cubo nunca son nulas, así que todos los códigos son válidos
+    codes, uniques = pd.factorize(keys, sort=True)
+    return codes, np.asarray(uniques)
+
+
+def group_ratios(
+    cube: pd.DataFrame, codes: np.ndarray, n: int, cols: list[str]
+) -> dict[str, np.ndarray]:
+    """ Obtiene la media de cada métrica por grupo, a partir de sus sumas y recuentos. """
+    means = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for col in cols:
+            sums = np.bincount(codes, weights=cube[f"{col}_sum"].to_numpy(), minlength=n)
+            counts = np.bincount(codes, weights=cube[f"{col}_count"].to_numpy(), minlength=n)
+            # Sin alumnos la media queda vacía, como en rollup
+            means[col] = sums / counts
+    return means
+
+
+def group_means(
+    cube: pd.DataFrame, by: str, cols: list[str]
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """ Agrega el cubo por una columna y obtiene sus valores y la media de cada métrica. """
+    codes, values = group_codes(cube[by])
+    return values, group_ratios(cube, codes, len(values), cols)
+
+
+def grid_means(
+    cube: pd.DataFrame, rows: str, columns: str, cols: list[str]
+) -> tuple[np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+    """ Agrega el cubo por dos columnas y obtiene la media de cada métrica en una matriz
+    con todas las combinaciones, vacía en las que no tienen alumnos. """
+    row_codes, row_values = group_codes(cube[rows])
+    col_codes, col_values = group_codes(cube[columns])
+    shape = (len(row_values), len(col_values))
+    means = group_ratios(cube, row_codes * shape[1] + col_codes, shape[0] * shape[1], cols)
+    return row_values, col_values, {col: means[col].reshape(shape) for col in cols}
+
+
+def fourth_year(cube: pd.DataFrame) -> pd.DataFrame:
+    """ Obtiene las filas del cubo de los alumnos de cuarto en el tercer trimestre. """
+    mask = (cube["Curso"] == "Cuarto").to_numpy() & (cube["Trimestre"] == 3).to_numpy()
+    return cube[mask]
+
+
+def bar_labels(values: np.ndarray) -> np.ndarray:
+    """ Formatea los valores como etiquetas de las barras, con dos cifras significativas. """
+    labels = np.char.mod("%.2g", values)
+    # Las unidades enteras se muestran con un decimal, como 0.0 en las barras sin alumnos
+    whole = np.char.isdigit(np.char.lstrip(labels, "-")) & (np.abs(values) < 10)
+    labels = np.where(whole, np.char.add(labels, ".0"), labels)
+    return np.where(np.isnan(values), "", labels)
+
+
+def mean_series(
+    means: pd.DataFrame, col_name: str, objective: float, normalize: bool = False
+) -> list[dict]:
+    """ Obtiene una traza por trimestre con las medias de una columna, o su diferencia con el objetivo. """
+    courses, trims = means.index.levels  # type: ignore
+    # La tabla tiene todas las combinaciones, ordenadas por curso y trimestre
+    values = means[col_name].to_numpy().reshape(len(courses), len(trims)).T
+    ogs = np.where(np.isnan(values), objective if normalize else 0, values)
+    y = ogs - objective if normalize else ogs
+    text = bar_labels(y)
+    x = np.asarray(courses)
+    return [
+        {"name": str(trim), "x": x, "y": y[i], "text": text[i], "hover": ogs[i]}
+        for i, trim in enumerate(trims)
+    ]
+
+
+def avance_series(
+    avance: pd.DataFrame, objective: float, normalize: bool = False
+) -> list[dict]:
+    """ Obtiene las trazas de los alumnos de cuarto que se presentan y que avanzan. """
+    x = avance["Año_Curso"].to_numpy()
+    traces = []
+    for col in avance_cols:
+        values = avance[col].to_numpy()
+        traces.append({"name": col, "x": x, "y": values - objective if normalize else values})
+    return traces
+
+
+def satisfaction_series(cube: pd.DataFrame, by: str) -> list[dict]:
+    """ Obtiene una traza por nivel de satisfacción con el porcentaje de alumnos de cada valor de una columna. """
+    codes, x = group_codes(cube[by])
+    counts = np.stack([
+        np.bincount(codes, weights=cube[f"Satisfaccion_{level}"].to_numpy(), minlength=len(x))
+        for level in satisfaccion_levels
+    ])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shares = counts / counts.sum(axis=0) * 100
+    # Los niveles se apilan del 5 al 1 y cada traza omite los valores sin alumnos
+    return [
+        {"name": str(level), "x": x[row > 0], "y": share[row > 0]}
+        for level, row, share in reversed(list(zip(satisfaccion_levels, counts, shares)))
+    ]
+
+
+@timed("aggregation")
+def comparativa_series(
+    data: pd.DataFrame, categoria: str, tipo_graf: str, seleccion: str = "General"
+) -> list[dict] | None:
+    """ Obtiene las trazas de la comparativa de una métrica entre los valores de una categoría.
+    Con una selección, las medias se muestran como diferencia con la del valor seleccionado.
+    Para los tipos de band_types, data es el cubo del acceso a la banda. """
+    col = tipo_col[tipo_graf]
+    if col == "Satisfaccion":
+        return satisfaction_series(data, categoria)
+    if col == "Avance_Grado_Profesional":
+        x, means = group_means(fourth_year(data), categoria, avance_cols)
+    elif tipo_graf in band_types:
+        # data es el cubo del acceso a la banda de los alumnos de tercer año
+        x, ratios = group_means(data, categoria, ["Acceso_Banda"])
+        means = {col: ratios["Acceso_Banda"]}
+    else:
+        x, means = group_means(data, categoria, [col])
+    if seleccion != "General":
+        selected = means[col][x == seleccion]
+        # La selección puede no estar todavía entre los valores del periodo
+        if len(selected) == 0:
+            return None
+        means[col] = means[col] - selected[0]
+    return [{"name": name, "x": x, "y": y} for name, y in means.items()]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from cube import cube_keys
+
+# Año de permanencia en el que se mide el acceso a la banda
+band_year = 3
+
+# Hitos del índice de alumnos: fecha de cada uno y columnas de la fila en que ocurre
+milestones = {
+    "Inscripcion": ["Cohorte", "Curso_Inicial"],
+    "Primera_Banda": ["Años_Banda"],
+    "Fecha_Salida": ["Salida"],
+}
+
+
+def _first(df: pd.DataFrame, when: str, cols: list[str]) -> pd.DataFrame:
+    """ Obtiene, para cada alumno del índice, la fila más antigua según la columna when. """
+    df = df.loc[df[when].notna(), [when, *cols]]
+    df = df.iloc[np.argsort(df[when].to_numpy(), kind="stable")]
+    return df[~df.index.duplicated()]
+
+
+def build_cohorts(data: pd.DataFrame) -> pd.DataFrame:
+    """ Construye el índice longitudinal con una fila por alumno: inscripción, primer trimestre en la banda y salida. """
+    rows = data.set_index("ID_Alumno")
+    inscripcion = _first(rows, "Fecha", ["Año_Curso", "Curso"]).rename(
+        columns={"Fecha": "Inscripcion", "Año_Curso": "Cohorte", "Curso": "Curso_Inicial"}
+    )
+    banda = _first(rows[rows["Banda"]], "Fecha", ["Años_Inscrito"]).rename(
+        columns={"Fecha": "Primera_Banda", "Años_Inscrito": "Años_Banda"}
+    )
+    salidas = rows[rows["Abandono_Educacion"] | rows["Avance_Grado_Profesional"]]
+    salida = _first(salidas, "Fecha", ["Abandono_Educacion"])
+    salida = pd.DataFrame(
+        {
+            "Fecha_Salida": salida["Fecha"],
+            "Salida": pd.Categorical(
+                np.where(salida["Abandono_Educacion"], "Abandono", "Grado Profesional"),
+                categories=["Abandono", "Grado Profesional"],
+            ),
+        },
+        index=salida.index,
+    )
+    return inscripcion.join([banda, salida]).sort_index()
+
+
+def merge_cohorts(cohorts: pd.DataFrame, other: pd.DataFrame) -> pd.DataFrame:
+    """ Combina dos índices de alumnos quedándose con el hito más antiguo de cada uno. """
+    # Se unifican las categorías para no perder el tipo al concatenar
+    for col in milestones["Inscripcion"]:
+        union = cohorts[col].cat.categories.union(other[col].cat.categories)
+        cohorts = cohorts.assign(**{col: cohorts[col].cat.set_categories(union)})
+        other = other.assign(**{col: other[col].cat.set_categories(union)})
+    both = pd.concat([cohorts, other])
+    parts = [_first(both, when, cols) for when, cols in milestones.items()]
+    return parts[0].join(parts[1:]).sort_index()
+
+
+def band_cube(data: pd.DataFrame, cohorts: pd.DataFrame) -> pd.DataFrame:
+    """ Construye el cubo del acceso a la banda de los alumnos en su tercer año. """
+    # Cada fila de tercer año cuenta si el alumno ya había estado en la banda en
+    # esa fecha, según su primer trimestre en el índice
+    rows = data[data["Años_Inscrito"] == band_year]
+    first = cohorts["Primera_Banda"].reindex(rows["ID_Alumno"]).to_numpy()
+    access = pd.Series(first <= rows["Fecha"].to_numpy(), index=rows.index, dtype="float64")
+    grouped = access.groupby([rows[key] for key in cube_keys], observed=True, sort=True)
+    return pd.DataFrame(
+        {"Acceso_Banda_sum": grouped.sum(), "Acceso_Banda_count": grouped.count()}
+    ).reset_index()
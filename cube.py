@@ -0,0 +1,79 @@
+import pandas as pd
+
+from snapshot import align_categories
+
+# Claves del cubo. Fecha depende de (Año_Curso, Trimestre), pero se mantiene
+# para poder filtrar el cubo con filter_data igual que el dataset.
+cube_keys = [
+    "Fecha",
+    "Año_Curso",
+    "Trimestre",
+    "Curso",
+    "Asignatura",
+    "Profesor",
+    "Instrumento",
+]
+
+cube_metrics = [
+    "Aprobado",
+    "Horas_Practica",
+    "Promedio_Asistencia",
+    "Banda",
+    "Abandono_Educacion",
+    "Pruebas_Grado_Profesional",
+    "Avance_Grado_Profesional",
+    "Satisfaccion",
+]
+
+satisfaccion_levels = [1, 2, 3, 4, 5]
+
+# Claves del resumen por trimestre, suficientes para calcular los objetivos
+term_keys = ["Fecha", "Año_Curso", "Trimestre", "Curso"]
+
+
+def build_cube(data: pd.DataFrame) -> pd.DataFrame:
+    """ Construye el cubo con la suma y el recuento de cada métrica por combinación de claves. """
+    values = data[cube_metrics].astype("float64")
+    # Las métricas en float32 (proporciones entre 0 y 1) se redondean a su precisión
+    # para que las sumas no arrastren el error de representación del tipo compacto
+    for col in cube_metrics:
+        if data[col].dtype == "float32":
+            values[col] = values[col].round(7)
+    # Recuento de alumnos por nivel de satisfacción, para la distribución
+    for level in satisfaccion_levels:
+        values[f"Satisfaccion_{level}"] = (data["Satisfaccion"] == level).astype("int64")
+    grouped = values.groupby([data[key] for key in cube_keys], observed=True, sort=True)
+    sums = grouped[cube_metrics].sum().add_suffix("_sum")
+    counts = grouped[cube_metrics].count().add_suffix("_count")
+    levels = grouped[[f"Satisfaccion_{level}" for level in satisfaccion_levels]].sum()
+    return pd.concat([sums, counts, levels], axis=1).reset_index()
+
+
+def term_cube(cube: pd.DataFrame) -> pd.DataFrame:
+    """ Reduce el cubo a una fila por trimestre y nivel. """
+    return (
+        cube.groupby(term_keys, observed=True, sort=True)
+        .sum(numeric_only=True)
+        .reset_index()
+    )
+
+
+def merge_cubes(cube: pd.DataFrame, other: pd.DataFrame) -> pd.DataFrame:
+    """ Suma dos cubos de métricas, combinando las celdas con las mismas claves. """
+    cube, other = align_categories(cube, other)
+    combined = pd.concat([cube, other], ignore_index=True)
+    # Un trimestre nuevo no comparte celdas con el cubo y ya queda ordenado
+    if len(cube) == 0 or other["Fecha"].min() > cube["Fecha"].max():
+        return combined
+    return combined.groupby(cube_keys, observed=True, sort=True).sum().reset_index()
+
+
+def rollup(cube: pd.DataFrame, by: str | list[str], cols: list[str]) -> pd.DataFrame:
+    """ Agrega el cubo por las columnas indicadas y devuelve la media de cada métrica. """
+    grouped = cube.groupby(by, observed=True)[
+        [f"{col}_sum" for col in cols] + [f"{col}_count" for col in cols]
+    ].sum()
+    return pd.DataFrame(
+        {col: grouped[f"{col}_sum"] / grouped[f"{col}_count"] for col in cols}
+    ).sort_index()
+
@@ -1,5 +1,10 @@
 # Volver a cargar las bibliotecas y dataset debido al reinicio
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, timedelta
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from faker import Faker
@@ -119,9 +124,206 @@ def generar_alumnos(id_inicial, n_alumnos):
     return pd.DataFrame(data)
 
 
+# Nombres de profesores reproducibles a partir de una semilla
+def nombres_profesores(seed, n=10):
+    fake_seeded = Faker()
+    fake_seeded.seed_instance(seed)
+    return [fake_seeded.name() for _ in range(n)]
+
+
+# Misma simulación que generar_alumnos, pero avanzando a todos los alumnos a la
+# vez trimestre a trimestre con operaciones sobre arrays
+def generar_alumnos_vectorizado(id_inicial, n_alumnos, seed=None, nombres=None):
+    rng = np.random.default_rng(seed)
+    if nombres is None:
+        nombres = profesores if seed is None else nombres_profesores(seed)
+    start_year = (date.today() - timedelta(days=6 * 365)).year
+    end_year = date.today().year
+
+    prob_curso = np.array([curso_probabilidades[c] for c in cursos])
+    curso_examen = np.isin(cursos, ["Tercero", "Cuarto"])
+    ultimo_curso = len(cursos) - 1
+
+    # Estado de cada alumno
+    ids = np.arange(id_inicial, id_inicial + n_alumnos)
+    año_inicio = rng.integers(start_year, end_year + 1, size=n_alumnos)
+    curso_alumno = rng.integers(0, 3, size=n_alumnos)  # Iniciación, Primero o Segundo
+    años_inscrito = np.zeros(n_alumnos, dtype=np.int64)
+    activo = np.ones(n_alumnos, dtype=bool)
+
+    fechas, cursos_año = [], []
+    bloques = []
+    for año in range(start_year, end_year + 1):
+        for mes in [12, 3, 6]:
+            match mes:
+                case 12:
+                    trimestre = 1
+                    curso = f"{año}-{año+1}"
+                case 3:
+                    trimestre = 2
+                    curso = f"{año-1}-{año}"
+                case 6:
+                    trimestre = 3
+                    curso = f"{año-1}-{año}"
+            sel = np.flatnonzero(activo & (año_inicio <= año))
+            n = len(sel)
+            if n == 0:
+                continue
+            if mes == 12:
+                años_inscrito[sel] += 1
+            nivel = curso_alumno[sel]
+            abandono = rng.random(n) < 0.08
+            pruebas = (
+                ~abandono
+                & (trimestre == 3)
+                & curso_examen[nivel]
+                & (rng.random(n) < prob_curso[nivel])
+            )
+            profesional = pruebas & (rng.random(n) < 0.8)
+
+            fechas.append(f"{año}-{mes:02d}-01")
+            if curso not in cursos_año:
+                cursos_año.append(curso)
+            bloques.append({
+                "ID_Alumno": ids[sel],
+                "Fecha": np.full(n, len(fechas) - 1),
+                "Curso": nivel,
+                "Años_Inscrito": años_inscrito[sel],
+                "Año_Curso": np.full(n, cursos_año.index(curso)),
+                "Trimestre": np.full(n, trimestre),
+                "Banda": (años_inscrito[sel] >= 2) & (rng.random(n) < prob_curso[nivel]),
+                "Asignatura": rng.integers(0, len(asignaturas), size=n),
+                "Instrumento": rng.integers(0, len(instrumentos), size=n),
+                "Profesor": rng.integers(0, len(nombres), size=n),
+                "Aprobado": rng.random(n) < 0.8,  # 80% probabilidad de aprobar
+                "Horas_Practica": rng.integers(1, 8, size=n),
+                "Satisfaccion": rng.choice([1, 2, 3, 4, 5], p=[0.05, 0.05, 0.15, 0.4, 0.35], size=n),
+                "Abandono_Educacion": abandono,
+                "Pruebas_Grado_Profesional": pruebas,
+                "Avance_Grado_Profesional": profesional,
+                "Promedio_Asistencia": np.round(rng.uniform(0.6, 1.0, size=n), 2),
+            })
+
+            # Los que abandonan o pasan a profesional dejan de aparecer
+            activo[sel[abandono | profesional]] = False
+            # 80% probabilidad de avanzar de curso al final del año
+            if mes == 6:
+                avanza = sel[rng.random(n) < 0.8]
+                curso_alumno[avanza] = np.minimum(curso_alumno[avanza] + 1, ultimo_curso)
+
+    if not bloques:
+        return pd.DataFrame()
+    columnas = {col: np.concatenate([b[col] for b in bloques]) for col in bloques[0]}
+    # Mismo orden que generar_alumnos: todas las filas de un alumno seguidas
+    orden = np.argsort(columnas["ID_Alumno"], kind="stable")
+    columnas = {col: valores[orden] for col, valores in columnas.items()}
+    categorias = {
+        "Fecha": fechas,
+        "Curso": cursos,
+        "Año_Curso": cursos_año,
+        "Asignatura": asignaturas,
+        "Instrumento": instrumentos,
+        "Profesor": nombres,
+    }
+    for col, valores in categorias.items():
+        columnas[col] = pd.Categorical.from_codes(columnas[col], categories=valores)
+    return pd.DataFrame(columnas)
+
+
+# Genera un tramo de IDs por bloques y escribe cada bloque a disco nada más
+# generarlo, de modo que la memoria depende del bloque y no del tramo
+def generar_shard(shard, id_inicial, n_alumnos, seed, nombres, destino, formato, bloque):
+    n_bloques = max(1, -(-n_alumnos // bloque))
+    semillas = seed.spawn(n_bloques)
+    ficheros = []
+    filas = 0
+    csv_path = destino / f"part-{shard:04d}.csv"
+    for i, semilla in enumerate(semillas):
+        inicio = id_inicial + i * bloque
+        n = min(bloque, id_inicial + n_alumnos - inicio)
+        if n <= 0:
+            break
+        df = generar_alumnos_vectorizado(inicio, n, seed=semilla, nombres=nombres)
+        filas += len(df)
+        if len(df) == 0:
+            continue
+        if formato == "csv":
+            df.to_csv(csv_path, index=False, mode="w" if i == 0 else "a", header=i == 0)
+            if csv_path.name not in ficheros:
+                ficheros.append(csv_path.name)
+        else:
+            from snapshot import write_snapshot
+
+            parte = destino / f"part-{shard:04d}-{i:04d}.snapshot"
+            write_snapshot(df, parte)
+            ficheros.append(parte.name)
+    return {
+        "shard": shard,
+        "id_inicial": id_inicial,
+        "id_final": id_inicial + n_alumnos - 1,
+        "filas": filas,
+        "ficheros": ficheros,
+    }
+
+
+# Reparte los IDs en tramos entre procesos, cada uno con su propio flujo
+# aleatorio derivado de la semilla, y deja un manifiesto con el resultado
+def generar_dataset(destino, n_alumnos, shards, seed=0, workers=None, formato="csv", bloque=50_000, id_inicial=1):
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    nombres = nombres_profesores(seed)
+    semillas = np.random.SeedSequence(seed).spawn(shards)
+    tamaño = -(-n_alumnos // shards)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = []
+        for shard, semilla in enumerate(semillas):
+            inicio = id_inicial + shard * tamaño
+            n = min(tamaño, id_inicial + n_alumnos - inicio)
+            if n <= 0:
+                break
+            futuros.append(pool.submit(
+                generar_shard, shard, inicio, n, semilla, nombres, destino, formato, bloque
+            ))
+        partes = [f.result() for f in futuros]
+    manifiesto = {
+        "seed": seed,
+        "n_alumnos": n_alumnos,
+        "shards": len(partes),
+        "formato": formato,
+        "bloque": bloque,
+        "profesores": nombres,
+        "filas": sum(p["filas"] for p in partes),
+        "partes": partes,
+    }
+    with open(destino / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    return manifiesto
+
+
 if __name__ == "__main__":
-    # Generar nuevos datos 
-    id_inicial = 1
-    nuevos_alumnos = 500
-    df_alumnos = generar_alumnos(id_inicial, nuevos_alumnos)
-    df_alumnos.to_csv("./dataset.csv", index=False)
+    parser = argparse.ArgumentParser(description="Genera el dataset de la escuela")
+    parser.add_argument("--alumnos", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--shards", type=int, default=0, help="Generación en paralelo por tramos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--bloque", type=int, default=50_000, help="Alumnos por bloque escrito")
+    parser.add_argument("--formato", choices=["csv", "snapshot"], default="csv")
+    parser.add_argument("--destino", default=None)
+    args = parser.parse_args()
+
+    if args.shards:
+        manifiesto = generar_dataset(
+            args.destino or "./dataset_parts",
+            args.alumnos,
+            args.shards,
+            seed=args.seed or 0,
+            workers=args.workers,
+            formato=args.formato,
+            bloque=args.bloque,
+        )
+        print(f"{manifiesto['filas']} filas en {manifiesto['shards']} shards")
+    else:
+        # Generar nuevos datos 
+        id_inicial = 1
+        df_alumnos = generar_alumnos_vectorizado(id_inicial, args.alumnos, seed=args.seed)
+        df_alumnos.to_csv(args.destino or "./dataset.csv", index=False)
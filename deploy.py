@@ -0,0 +1,42 @@
+import argparse
+import logging
+import os
+from pathlib import Path
+
+import uvicorn
+
+from snapshot import publish_snapshot
+
+logger = logging.getLogger(__name__)
+
+app_dir = Path(__file__).parent
+dataset_path = app_dir / "dataset.csv"
+snapshot_path = app_dir / "dataset.snapshot"
+
+
+if __name__ == "__main__":
+    # Uso: python deploy.py --workers 4
+    # Este proceso no importa la aplicación: solo publica el snapshot y lanza los
+    # workers, que lo mapean en memoria sin volver a leer el CSV
+    parser = argparse.ArgumentParser(
+        description="Arranca el dashboard en varios workers que comparten el dataset"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+
+    if publish_snapshot(dataset_path, snapshot_path):
+        logger.info("Snapshot publicado en %s", snapshot_path)
+    os.environ["DASHBOARD_SHARED_DATASET"] = "1"
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=str(app_dir),
+    )
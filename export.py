@@ -0,0 +1,240 @@
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterator
+
+from plotly.graph_objects import Figure
+
+from cube import term_keys
+from plot_utils import (
+    avance_fig,
+    avance_table,
+    comparativa_fig,
+    mean_fig,
+    mean_table,
+    satisfaccion_fig,
+)
+from shared import (
+    band_types,
+    course_to_date,
+    filter_options,
+    last_entry_ds,
+    load_band_index,
+    load_cube_index,
+    load_filtered,
+    load_objectives,
+    period_keys,
+    select_choices,
+    tipo_col,
+    type_options,
+)
+
+logger = logging.getLogger(__name__)
+
+app_dir = Path(__file__).parent
+export_dir = app_dir / "export"
+plotlyjs_file = "plotly.min.js"
+manifest_file = "vistas.jsonl"
+
+# Tarjetas de medias del dashboard: nombre, columna y título del eje, como en app.py
+mean_cards = [
+    ("aprobado", "Aprobado", "Promedio de Aprobado"),
+    ("horas_practica", "Horas_Practica", "Horas de Práctica Semanales"),
+    ("asistencia", "Promedio_Asistencia", "Promedio de Asistencia"),
+    ("abandono", "Abandono_Educacion", "Proporción de Alumnos Totales"),
+]
+
+
+def slug(text: str) -> str:
+    """ Convierte un valor de los filtros en un nombre de fichero. """
+    return re.sub(r"[^\w.-]+", "_", str(text)).strip("_")
+
+
+def export_periods(all_periods: bool, courses: list[str], trims: list[int]) -> list[tuple[int, str]]:
+    """ Obtiene los periodos de inicio a exportar, como pares (trimestre, curso). """
+    if all_periods:
+        courses = sorted(load_cube_index().frame["Año_Curso"].unique().tolist())
+        trims = [1, 2, 3]
+    return [(trim, course) for course in courses for trim in trims]
+
+
+def export_selections() -> list[tuple[str, str]]:
+    """ Obtiene todas las combinaciones de categoría y selección de la barra lateral. """
+    cube = load_cube_index().frame
+    return [
+        (category, selected)
+        for category in filter_options
+        for selected in select_choices(cube, category)
+    ]
+
+
+def selection_views(
+    period: tuple[int, str], category: str, selected: str, difference: bool = False
+) -> Iterator[tuple[str, str | None, Callable[[], Figure]]]:
+    """ Genera la tarjeta, el tipo de comparación y la función que crea cada gráfica del
+    dashboard para unos filtros, con los mismos datos que la aplicación. """
+    start = course_to_date(*period)
+    objectives = load_objectives(date.today())
+    if objectives is None:
+        raise RuntimeError("No hay datos suficientes para calcular los objetivos")
+    data = load_filtered(start, category, selected, by=term_keys)
+    if data is None:
+        raise ValueError(f"La categoría {category} no admite selección")
+    band_data = load_filtered(start, category, selected, by=term_keys, band=True)
+    period_data = load_filtered(start, by=period_keys(category))
+    band_period = load_filtered(start, by=period_keys(category), band=True)
+    # Las tablas se calculan una vez y las comparten todas las gráficas que las usan
+    means = mean_table(data, [col for _, col, _ in mean_cards])
+    band_means = mean_table(band_data, ["Acceso_Banda"])
+    avance = avance_table(data)
+
+    variants = [False, True] if difference else [False]
+    for normalize in variants:
+        suffix = "_diferencia" if normalize else ""
+        for chart, col, title in mean_cards:
+            yield chart + suffix, None, lambda col=col, title=title, normalize=normalize: (
+                mean_fig(means, objectives[col], col, title, normalize=normalize)
+            )
+        yield "acceso_banda" + suffix, None, lambda normalize=normalize: mean_fig(
+            band_means,
+            objectives["Banda"],
+            "Acceso_Banda",
+            "Proporción que Accede a Banda",
+            normalize=normalize,
+        )
+        yield "avance_estudios" + suffix, None, lambda normalize=normalize: avance_fig(
+            avance, objectives["Avance_Grado_Profesional"], normalize=normalize
+        )
+    yield "satisfaccion", None, lambda: satisfaccion_fig(data, objectives["Satisfaccion"])
+    for tipo in type_options:
+        source = band_period if tipo in band_types else period_data
+        yield "comparativa", tipo, lambda tipo=tipo, source=source: comparativa_fig(
+            source, objectives[tipo_col[tipo]], category, selected, tipo
+        )
+
+
+def export_selection(
+    dest: Path,
+    period: tuple[int, str],
+    category: str,
+    selected: str,
+    formats: list[str],
+    difference: bool = False,
+) -> list[dict]:
+    """ Escribe las gráficas de unos filtros y devuelve una entrada del manifiesto por gráfica. """
+    trim, course = period
+    folder = dest / f"{slug(course)}_T{trim}" / slug(category) / slug(selected)
+    folder.mkdir(parents=True, exist_ok=True)
+    # Las páginas enlazan el plotly.js común de la raíz de la exportación
+    plotlyjs = os.path.relpath(dest / plotlyjs_file, folder).replace(os.sep, "/")
+    base = {"curso": course, "trimestre": trim, "categoria": category, "seleccion": selected}
+    entries = []
+    try:
+        views = list(selection_views(period, category, selected, difference))
+    except Exception as e:
+        return [{**base, "vista": None, "error": repr(e)}]
+    for chart, tipo, build in views:
+        name = chart if tipo is None else f"{chart}_{slug(tipo_col[tipo])}"
+        entry = {**base, "vista": name}
+        start = time.perf_counter()
+        try:
+            fig = build()
+            # Cada gráfica se escribe en cuanto se crea
+            if "json" in formats:
+                (folder / f"{name}.json").write_text(fig.to_json(), encoding="utf-8")
+            if "html" in formats:
+                fig.write_html(folder / f"{name}.html", include_plotlyjs=plotlyjs)
+            entry["ruta"] = (folder / name).relative_to(dest).as_posix()
+        except Exception as e:
+            entry["error"] = repr(e)
+        entry["segundos"] = round(time.perf_counter() - start, 4)
+        entries.append(entry)
+    return entries
+
+
+def load_worker() -> None:
+    """ Carga el dataset y sus agregados una sola vez en cada proceso de la exportación. """
+    # Con fork los procesos heredan lo ya cargado y esto no vuelve a leer el dataset
+    logging.getLogger("shared").setLevel(logging.WARNING)
+    load_cube_index()
+    load_band_index()
+    load_objectives(date.today())
+
+
+def export_all(
+    dest: Path,
+    periods: list[tuple[int, str]],
+    formats: list[str],
+    workers: int | None = None,
+    difference: bool = False,
+) -> dict[str, int]:
+    """ Exporta todas las gráficas de los periodos indicados repartiéndolas entre procesos. """
+    dest.mkdir(parents=True, exist_ok=True)
+    if "html" in formats:
+        from plotly.offline import get_plotlyjs
+
+        (dest / plotlyjs_file).write_text(get_plotlyjs(), encoding="utf-8")
+    tasks = [(period, *selection) for period in periods for selection in export_selections()]
+    totals = {"selecciones": len(tasks), "vistas": 0, "errores": 0}
+    start = time.perf_counter()
+    # El manifiesto se completa según terminan las tareas, en el orden en que lo hacen
+    with open(dest / manifest_file, "w", encoding="utf-8") as manifest:
+        with ProcessPoolExecutor(max_workers=workers, initializer=load_worker) as pool:
+            futures = [
+                pool.submit(export_selection, dest, period, category, selected, formats, difference)
+                for period, category, selected in tasks
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                entries = future.result()
+                for entry in entries:
+                    manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                manifest.flush()
+                totals["vistas"] += sum("ruta" in entry for entry in entries)
+                totals["errores"] += sum("error" in entry for entry in entries)
+                logger.info(
+                    "%d/%d selecciones, %d vistas (%.1f s)",
+                    done, len(tasks), totals["vistas"], time.perf_counter() - start,
+                )
+    return totals
+
+
+if __name__ == "__main__":
+    # Uso: python export.py --todos --formatos html json
+    actual_trim, actual_course = last_entry_ds(date.today())
+    parser = argparse.ArgumentParser(
+        description="Exporta las gráficas del dashboard para todas las combinaciones de filtros"
+    )
+    parser.add_argument("--destino", type=Path, default=export_dir)
+    parser.add_argument("--formatos", choices=["html", "json"], nargs="+", default=["html", "json"])
+    parser.add_argument("--cursos", nargs="+", default=[actual_course], help="Cursos de inicio")
+    parser.add_argument(
+        "--trimestres", type=int, choices=[1, 2, 3], nargs="+", default=[actual_trim],
+        help="Trimestres de inicio",
+    )
+    parser.add_argument(
+        "--todos", action="store_true",
+        help="Exporta todos los cursos y trimestres de inicio del dataset",
+    )
+    parser.add_argument(
+        "--diferencia", action="store_true",
+        help="Exporta también la diferencia con el objetivo de las tarjetas",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+
+    periods = export_periods(args.todos, args.cursos, args.trimestres)
+    totals = export_all(args.destino, periods, args.formatos, args.workers, args.diferencia)
+    print(
+        f"{totals['vistas']} vistas de {totals['selecciones']} selecciones en {args.destino}"
+        f" ({totals['errores']} errores, detalle en {manifest_file})"
+    )
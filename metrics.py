@@ -0,0 +1,194 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Mapping
+
+from shiny.session import get_current_session
+
+# Límites de los histogramas de latencia, en segundos
+latency_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """ Histograma acumulado de latencias por etiquetas, en el formato de Prometheus. """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...],
+        buckets: tuple[float, ...] = latency_buckets,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """ Añade una medida a la serie de sus etiquetas. """
+        key = tuple(labels[label] for label in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Recuento por límite, con el último para los que superan todos
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        """ Obtiene las líneas del histograma en el formato de texto de Prometheus. """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = ",".join(f'{label}="{value}"' for label, value in zip(self.labels, key))
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+output_seconds = Histogram(
+    "dashboard_output_seconds",
+    "Tiempo total de cálculo de cada output.",
+    ("output",),
+)
+phase_seconds = Histogram(
+    "dashboard_phase_seconds",
+    "Tiempo de cada output repartido en agregación, creación de la figura y serialización.",
+    ("output", "phase"),
+)
+step_seconds = Histogram(
+    "dashboard_step_seconds",
+    "Tiempo propio de cada cálculo instrumentado, sin los cálculos anidados.",
+    ("step", "phase"),
+)
+
+# Output que se está calculando y tiempo de las fases anidadas en la fase actual
+_current_output: ContextVar[str] = ContextVar("current_output", default="none")
+_current_phase: ContextVar[list[float] | None] = ContextVar("current_phase", default=None)
+
+
+@contextmanager
+def output_scope(name: str) -> Iterator[None]:
+    """ Atribuye al output indicado las fases que se midan dentro. """
+    token = _current_output.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        output_seconds.observe(time.perf_counter() - start, output=name)
+        _current_output.reset(token)
+
+
+@contextmanager
+def phase(name: str, step: str | None = None) -> Iterator[None]:
+    """ Mide una fase del output actual. Las fases anidadas se descuentan de esta. """
+    parent = _current_phase.get()
+    nested = [0.0]
+    token = _current_phase.set(nested)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_phase.reset(token)
+        if parent is not None:
+            parent[0] += elapsed
+        own = max(elapsed - nested[0], 0.0)
+        phase_seconds.observe(own, output=_current_output.get(), phase=name)
+        if step is not None:
+            step_seconds.observe(own, step=step, phase=name)
+
+
+def timed(phase_name: str):
+    """ Decorador que mide cada llamada a la función como una fase del output actual. """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(phase_name, fn.__name__):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_output(fn):
+    """ Decorador para las funciones de render que mide el output y atribuye sus fases. """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with output_scope(fn.__name__):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+# Sesiones abiertas en el proceso
+_sessions = 0
+_sessions_lock = threading.Lock()
+
+
+def track_session() -> None:
+    """ Cuenta la sesión actual como activa hasta que termine. """
+    global _sessions
+    session = get_current_session()
+    # Shiny Express ejecuta la aplicación una vez sin sesión real para crear la UI
+    if session is None or session.is_stub_session():
+        return
+    with _sessions_lock:
+        _sessions += 1
+
+    def ended() -> None:
+        global _sessions
+        with _sessions_lock:
+            _sessions -= 1
+
+    session.on_ended(ended)
+
+
+# Fuentes de estadísticas (por ejemplo, de las cachés) que se publican en /metrics
+_stats: dict[str, tuple[Callable[[], Mapping[str, float]], str, set[str]]] = {}
+
+
+def register_stats(
+    prefix: str,
+    source: Callable[[], Mapping[str, float]],
+    help: str,
+    counters: set[str] = set(),
+) -> None:
+    """ Publica los valores de una fuente de estadísticas, como contadores o indicadores. """
+    _stats[prefix] = (source, help, counters)
+
+
+def metrics_text() -> str:
+    """ Obtiene todas las métricas en el formato de texto de Prometheus. """
+    lines = [
+        "# HELP dashboard_sessions Sesiones de Shiny abiertas.",
+        "# TYPE dashboard_sessions gauge",
+        f"dashboard_sessions {_sessions}",
+    ]
+    for prefix, (source, help, counters) in sorted(_stats.items()):
+        for key, value in source().items():
+            if key in counters:
+                name, kind = f"{prefix}_{key}_total", "counter"
+            else:
+                name, kind = f"{prefix}_{key}", "gauge"
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    for histogram in (output_seconds, phase_seconds, step_seconds):
+        lines += histogram.render()
+    return "\n".join(lines) + "\n"
@@ -1,373 +1,411 @@
-from typing import Literal
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Literal
 import pandas as pd
-import plotly.express as px
-from plotly.graph_objects import Figure, FigureWidget
+from plotly.graph_objects import Bar, Figure, FigureWidget, Scatter
+from plotly.utils import PlotlyJSONEncoder
+from chart_data import (
+    avance_cols,
+    avance_series,
+    comparativa_series,
+    fourth_year,
+    grid_means,
+    group_means,
+    mean_series,
+    satisfaction_series,
+)
+from cube import satisfaccion_levels
+from metrics import phase, register_stats
 from shared import tipo_col
 
+# Las figuras se crean con graph_objects a partir de los arrays de chart_data:
+# plotly.express reconstruye un DataFrame por figura y tarda más en crearla que
+# los datos en calcularse
+
+
+# Especificación de una figura tal como llega al navegador: sus trazas (data), su
+# layout y su configuración (config). Es lo que guarda la caché y lo que reciben
+# to_widget y patch_figure, sin crear ni validar una Figure
+FigureSpec = dict
+
+
+def figure_spec(fig: Figure) -> FigureSpec:
+    """ Obtiene la especificación de una figura. """
+    return {**json.loads(fig.to_json()), "config": fig._config}
+
+
+class FigureCache:
+    """ Caché LRU de figuras serializadas, acotada por el tamaño total de sus especificaciones.
+    Un acierto devuelve la especificación guardada, sin volver a crear la figura. """
+
+    def __init__(self, max_bytes: int = 32 * 2**20):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, tuple[str, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> FigureSpec | None:
+        """ Obtiene la especificación de una figura guardada, o None si no está en la caché. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        spec, config = entry
+        with phase("serialize"):
+            return {**json.loads(spec), "config": config}
+
+    def build(self, key: tuple, build: Callable[[], Figure]) -> FigureSpec:
+        """ Construye la figura, la guarda serializada y devuelve su especificación. """
+        # Un fallo cuenta al construir: una tarjeta que espera a sus tablas consulta varias veces
+        with self._lock:
+            self.misses += 1
+        with phase("build"):
+            fig = build()
+        with phase("serialize"):
+            spec = fig.to_json()
+        self._store(key, spec, fig._config)
+        with phase("serialize"):
+            return {**json.loads(spec), "config": fig._config}
+
+    def get_or_build(self, key: tuple, build: Callable[[], Figure]) -> FigureSpec:
+        """ Obtiene la especificación de la caché o construye la figura y la guarda. """
+        spec = self.get(key)
+        return self.build(key, build) if spec is None else spec
+
+    def _store(self, key: tuple, spec: str, config: dict) -> None:
+        if len(spec) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key)[0])
+            self._entries[key] = (spec, config)
+            self.size += len(spec)
+            while self.size > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self.size -= len(old)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        """ Obtiene los contadores de la caché. """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.size,
+            }
+
+
+# Caché común a todas las sesiones del proceso
+figure_cache = FigureCache()
+register_stats(
+    "dashboard_figure_cache",
+    figure_cache.stats,
+    "Caché de figuras compartida por las sesiones.",
+    counters={"hits", "misses", "evictions"},
+)
+
+
+# Propiedades de las trazas que cambian con los datos y se pueden actualizar en su sitio
+trace_data_props = ["x", "y", "text", "customdata"]
+
+
+def _spec_json(spec, skip: list[str] | None = None) -> str:
+    """ Serializa una especificación, sin las propiedades indicadas, para compararla. """
+    if isinstance(spec, dict) and skip:
+        spec = {k: v for k, v in spec.items() if k not in skip}
+    return json.dumps(spec, cls=PlotlyJSONEncoder, sort_keys=True)
+
+
+def to_widget(spec: FigureSpec) -> FigureWidget:
+    """ Convierte una especificación en el FigureWidget que se muestra, con su configuración. """
+    widget = FigureWidget(data=spec["data"], layout=spec["layout"])
+    widget._config = spec["config"]
+    return widget
+
+
+def displayed_margin(margin: dict) -> dict:
+    """ Obtiene el margen con que shinywidgets muestra una figura: el superior de 60 px pasa a 32. """
+    if margin.get("t") == 60:
+        return {**margin, "t": 32}
+    return margin
+
+
+def patch_figure(widget: FigureWidget, spec: FigureSpec) -> bool:
+    """ Actualiza en su sitio una figura ya mostrada. Devuelve False si hay que reconstruirla. """
+    # shinywidgets añade "responsive" a la configuración del widget que se muestra
+    shown_config = {k: v for k, v in widget._config.items() if k != "responsive"}
+    if shown_config != spec["config"]:
+        return False
+    # El uid lo asigna el FigureWidget a cada traza y no forma parte de la figura
+    skip_props = trace_data_props + ["uid"]
+    old_traces = [_spec_json(t.to_plotly_json(), skip_props) for t in widget.data]
+    new_traces = [_spec_json(t, skip_props) for t in spec["data"]]
+    layout = dict(spec["layout"])
+    old_layout = widget.layout.to_plotly_json()
+    # La plantilla la ajusta shinywidgets al mostrar la figura y el margen se compara
+    # ya ajustado. Del resto del layout solo se envían las claves que cambian o desaparecen
+    if "margin" in layout:
+        layout["margin"] = displayed_margin(layout["margin"])
+    changed = {
+        key: layout.get(key)
+        for key in set(layout) | set(old_layout)
+        if key not in ("template", "shapes")
+        and _spec_json(old_layout.get(key)) != _spec_json(layout.get(key))
+    }
+    if old_traces != new_traces:
+        # Cambia la estructura (número o estilo de las trazas): se sustituyen enteras
+        widget.data = []
+        widget.add_traces(spec["data"])
+    with widget.batch_update():
+        if old_traces == new_traces:
+            # Solo se envían las propiedades que han cambiado
+            for old, new in zip(widget.data, spec["data"]):
+                changes = {
+                    prop: new.get(prop)
+                    for prop in trace_data_props
+                    if _spec_json(old[prop]) != _spec_json(new.get(prop))
+                }
+                if changes:
+                    old.update(changes)
+        if changed:
+            widget.update_layout(changed, overwrite=True)
+        # La línea del objetivo
+        if _spec_json(old_layout.get("shapes")) != _spec_json(layout.get("shapes")):
+            widget.layout.shapes = layout.get("shapes", ())
+    return True
+
+
+# Métricas que se muestran como media por curso y trimestre
+mean_cols = [
+    "Aprobado",
+    "Horas_Practica",
+    "Promedio_Asistencia",
+    "Abandono_Educacion",
+]
+
+# Leyenda horizontal encima de la gráfica
+legend_top = dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0)
+
+# Colores de los niveles de satisfacción
+satisfaccion_colors = {
+    "1": "rgb(255,0,0)",  # Rojo intenso
+    "2": "rgb(255,102,102)",  # Rojo más claro
+    "3": "rgb(255,255,102)",  # Amarillo
+    "4": "rgb(144,238,144)",  # Verde claro
+    "5": "rgb(0,128,0)",  # Verde intenso
+}
+
+
+def mean_table(data: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    """ Obtiene la media de cada columna del cubo por curso y trimestre, con todas las combinaciones. """
+    courses, trims, means = grid_means(data, "Año_Curso", "Trimestre", cols)
+    # Las combinaciones sin alumnos quedan vacías y se rellenan al dibujar
+    index = pd.MultiIndex.from_product([courses, trims], names=["Año_Curso", "Trimestre"])
+    return pd.DataFrame({col: means[col].ravel() for col in cols}, index=index)
+
+
+def bar_figure(traces: list[dict], hovertemplate: str, **layout) -> Figure:
+    """ Crea una figura con una barra por traza de datos y sin la barra de herramientas. """
+    bars = []
+    for trace in traces:
+        bar = dict(
+            name=trace["name"].replace("_", " "),
+            legendgroup=trace["name"],
+            x=trace["x"],
+            y=trace["y"],
+            textposition="auto",
+            hovertemplate=hovertemplate.replace("{name}", trace["name"]),
+        )
+        if "text" in trace:
+            bar["text"] = trace["text"]
+        if "hover" in trace:
+            bar["customdata"] = trace["hover"]
+        bars.append(Bar(bar))
+    fig = Figure(bars, layout)
+    fig._config = fig._config | {"displayModeBar": False}
+    return fig
+
+
+def objective_line(fig: Figure, objective: float, normalize: bool = False) -> None:
+    """ Dibuja la línea del objetivo, que no se muestra en la diferencia con el objetivo. """
+    fig.layout.shapes = ()
+    if not normalize:
+        fig.add_hline(y=objective, line_dash="dash")
+
 
 def mean_fig(
-    data: pd.DataFrame,
+    means: pd.DataFrame,
     objective: float,
     col_name: str,
     name: str | None = None,
     normalize: bool = False,
     barmode: Literal["group", "stack"] = "group",
-) -> FigureWidget:
-    """ Crea una figura de barras con la media de una columna de un DataFrame. """
+) -> Figure:
+    """ Crea una figura de barras con la media de una columna de la tabla de medias. """
     if not name:
         name = col_name
 
-    fill_value = objective if normalize else 0
-
-    df = (
-        data.groupby(["Año_Curso", "Trimestre"], observed=True)[col_name]
-        .mean()
-        .sort_index()
-    )
-    df = df.reindex(
-        pd.MultiIndex.from_product(
-            [df.index.levels[0], df.index.levels[1]], # type: ignore
-            names=["Año_Curso", "Trimestre"], 
-        ),
-        fill_value=fill_value,
-    ).reset_index()
-    hover_data = {
-        "Trimestre": True,
-        "Año_Curso": False,
-        "Label": False,
-        col_name: ":.2f",
-    }
-    if normalize:
-        df["ogs"] = df[col_name].apply(lambda x: f"{x:.2}" if pd.notnull(x) else "")
-        df[col_name] = df[col_name] - objective
-        hover_data["ogs"] = ":.2f"  # Mantenemos los valores originales al hacer hover
-        hover_data[col_name] = False
-    df["Label"] = df[col_name].apply(lambda x: f"{x:.2}" if pd.notnull(x) else "")
-    fig = px.bar(
-        df,
-        x="Año_Curso",
-        y=col_name,
-        color="Trimestre",
+    # El hover mantiene los valores originales al restar el objetivo
+    fig = bar_figure(
+        mean_series(means, col_name, objective, normalize),
+        f"Trimestre={{name}}<br>{name}=%{{customdata:.2f}}<extra></extra>",
         barmode=barmode,
-        labels={
-            col_name: name,
-            "Año_Curso": "Curso",
-            "color": "Trimestre",
-            "ogs": name,
-        },
-        text="Label",
-        hover_data=hover_data,
+        legend=legend_top | {"title_text": "Trimestre", "tracegroupgap": 0},
+        margin=dict(t=60),
+        xaxis_title="Curso",
+        yaxis_title=name,
     )
+    objective_line(fig, objective, normalize)
+    return fig
 
-    # cambiar la leyenda a horizontal
-    fig.for_each_trace(lambda t: t.update(name=t.name.replace("_", " ")))
-    fig.update_layout(
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="left",
-            x=0,
-        )
+
+def satisfaction_layout(xaxis_title: str) -> dict:
+    """ Obtiene el layout de las barras apiladas de la satisfacción. """
+    return dict(
+        barmode="stack",
+        colorway=[satisfaccion_colors[str(level)] for level in reversed(satisfaccion_levels)],
+        legend=dict(title_text="Nivel de Satisfacción", tracegroupgap=0),
+        margin=dict(t=60),
+        showlegend=False,
+        xaxis_title=xaxis_title,
+        yaxis_title="Porcentaje",
     )
-    fig.update_traces(textposition="auto")
-    # Ocultar la barra de herramientas
-    fig = FigureWidget(fig)
-    fig._config = fig._config | {"displayModeBar": False}
-    if not normalize:
-        fig.add_hline(y=objective, line_dash="dash")
-    return fig
 
 
 def satisfaccion_fig(
     data: pd.DataFrame,
     objective: float,
-) -> FigureWidget:
+) -> Figure:
     """ Crea una figura de barras con la satisfacción de los alumnos. """
-    df = (
-        data.groupby(["Año_Curso", "Satisfaccion"], observed=True)["ID_Alumno"]
-        .count()
-        .sort_index()
-        .reset_index()
-    )
-    df["Porcentaje"] = df.groupby(["Año_Curso"], observed=False)["ID_Alumno"].transform(
-        lambda x: x / x.sum() * 100
+    fig = bar_figure(
+        satisfaction_series(data, "Año_Curso"),
+        "Nivel de Satisfacción={name}<br>Porcentaje=%{y:.2f}<extra></extra>",
+        **satisfaction_layout("Curso"),
     )
-    orden_satisfaccion = [5, 4, 3, 2, 1]  # Orden deseado
-    df["Satisfaccion"] = pd.Categorical(
-        df["Satisfaccion"], categories=orden_satisfaccion, ordered=True
-    )
-    df = df.sort_values(["Año_Curso", "Satisfaccion"], ascending=True)
-
-    fig = px.bar(
-        df,
-        x="Año_Curso",
-        y="Porcentaje",
-        color=df["Satisfaccion"].astype(str),
-        barmode="stack",
-        # Puedes asignar tus colores de satisfacción
-        color_discrete_map={
-            "1": "rgb(255,0,0)",  # Rojo intenso
-            "2": "rgb(255,102,102)",  # Rojo más claro
-            "3": "rgb(255,255,102)",  # Amarillo
-            "4": "rgb(144,238,144)",  # Verde claro
-            "5": "rgb(0,128,0)",  # Verde intenso
-        },
-        labels={
-            "Año_Curso": "Curso",
-            "color": "Nivel de Satisfacción",
-            "Porcentaje": "Porcentaje",
-        },
-        hover_data={
-            "Satisfaccion": False,
-            "Año_Curso": False,
-            "Porcentaje": ":.2f",
-        },
-    )
-
-    # 4. Ajustamos el layout si queremos
-    fig.update_layout(yaxis_title="Porcentaje", xaxis_title="Curso", showlegend=False)
     fig.add_hline(y=objective * 100, line_dash="dash")
-    fig = FigureWidget(fig)
-    fig._config = fig._config | {"displayModeBar": False}
     return fig
 
 
+def avance_table(data: pd.DataFrame) -> pd.DataFrame:
+    """ Obtiene la proporción de alumnos de cuarto que se presentan y avanzan a estudios profesionales. """
+    # Contar cuantos alumnos han pasado al grado profesional cada año
+    courses, means = group_means(fourth_year(data), "Año_Curso", avance_cols)
+    return pd.DataFrame({"Año_Curso": courses, **means})
+
+
 def avance_fig(
-    data: pd.DataFrame, objective: float, normalize: bool = False
-) -> FigureWidget:
+    df: pd.DataFrame, objective: float, normalize: bool = False
+) -> Figure:
     """ Crea una figura de barras con el avance de los alumnos de cuarto. """
-    df = data[data["Curso"] == "Cuarto"]
-    df = df[df["Trimestre"] == 3]
     if len(df) == 0:
         return figure_text(
             "No se han realizado pruebas a estudios profesionales en este periodo.", 14
         )
-    # Contar cuantos alumnos han pasado al grado profesional cada año
-    df = (
-        df.groupby("Año_Curso", observed=True)[  # type: ignore
-            ["Avance_Grado_Profesional", "Pruebas_Grado_Profesional"]
-        ]
-        .apply(lambda x: x.sum() / x.count())
-        .reset_index()
-    )
-    # Mostrar una gráfica de barras de plotly con los resultados para los que se presentan y los que avanzan
-    if normalize:
-        df["Avance_Grado_Profesional"] = df["Avance_Grado_Profesional"] - objective
-        df["Pruebas_Grado_Profesional"] = df["Pruebas_Grado_Profesional"] - objective
-
-    fig = px.bar(
-        df,
-        x="Año_Curso",
-        y=["Pruebas_Grado_Profesional", "Avance_Grado_Profesional"],
+    # Mostrar una gráfica de barras con los resultados para los que se presentan y los que avanzan
+    fig = bar_figure(
+        avance_series(df, objective, normalize),
+        "Proporción de Alumnos de Cuarto=%{y:.2f}<extra></extra>",
         barmode="group",
-        labels={
-            "value": "Proporción de Alumnos de Cuarto",
-            "variable": "Tipo",
-            "Año_Curso": "Curso",
-        },
-        hover_data={
-            "variable": False,
-            "Año_Curso": False,
-            "value": ":.2f",
-        },
+        legend=legend_top | {"title_text": "Tipo", "tracegroupgap": 0},
+        margin=dict(t=60),
+        xaxis_title="Curso",
+        yaxis_title="Proporción de Alumnos de Cuarto",
     )
-    # cambiar la leyenda
-    fig.for_each_trace(lambda t: t.update(name=t.name.replace("_", " ")))
-    fig.update_layout(
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",  # Anclarla en la parte inferior
-            y=1.02,
-            xanchor="left",
-            x=0,
-        )
-    )
-    if not normalize:
-        fig.add_hline(y=objective, line_dash="dash")
-    fig = FigureWidget(fig)
-    fig._config = fig._config | {"displayModeBar": False}
+    objective_line(fig, objective, normalize)
     return fig
 
 
-def prepare_df(data: pd.DataFrame, categoria: str, column: str) -> pd.DataFrame | None:
-    """ Prepara un DataFrame para ser usado en una gráfica de barras. """
-    match column:
-        case (
-            "Aprobado"
-            | "Horas_Practica"
-            | "Promedio_Asistencia"
-            | "Banda"
-            | "Abandono_Educacion"
-            | "Satisfaccion"
-        ):
-            return (
-                data.groupby(categoria, observed=True)[column]
-                .mean()
-                .sort_index()
-                .reset_index()
-            )
-        case "Avance_Grado_Profesional":
-            df = data[data["Curso"] == "Cuarto"]  # Solo los alumnos de cuarto
-            df = df[df["Trimestre"] == 3]  # Solo ultimo trimestre
-            if type(df) is not pd.DataFrame:
-                return None
-            return (
-                df.groupby(categoria, observed=True)[
-                    ["Avance_Grado_Profesional", "Pruebas_Grado_Profesional"]
-                ]
-                .apply(lambda x: x.sum() / x.count())
-                .reset_index()
-            )
-        case "Satisfaccion":
-            return data
-        case _:
-            raise ValueError("Tipo de gráfica no soportada")
-
-
 def comparativa_fig(
     data: pd.DataFrame,
     objective: float,
     categoria: str = "General",
     seleccion: str = "General",
     tipo_graf: str = "Tasa de aprobados",
-) -> FigureWidget:
+) -> Figure:
     """ Crea una figura de barras comparativa. """
     col = tipo_col[tipo_graf]
     if categoria == "General":
         return figure_text("Seleccione una categoría para comenzar la comparativa.")
 
-    df = prepare_df(data, categoria, col)
-    if df is None:
+    traces = comparativa_series(data, categoria, tipo_graf, seleccion)
+    # Evitamos que se quede el mensaje del error
+    if traces is None:
         return figure_text("Cargando")
     title = f"{tipo_graf} por {categoria}"
     if seleccion != "General" and tipo_graf != "Satisfacción":
-        # Evitamos que se quede el mensaje del error
-        try:
-            df[col] = df[col] - df[df[categoria] == seleccion][col].tolist()[0]  # type: ignore
-        except Exception as _:
-            return figure_text("Cargando")
         title = f"{title}: {seleccion}"
 
     # Trato especial para avance
     if col == "Avance_Grado_Profesional":
-        fig = fig_bar_acceso(df, categoria)
+        fig = fig_bar_acceso(traces, categoria)
     elif col == "Satisfaccion":
-        fig = fig_bar_satisfaccion(data, categoria)
+        fig = fig_bar_satisfaccion(traces, categoria)
     else:
-        fig = px.bar(df, x=categoria, y=col, title=title)
-    fig = FigureWidget(fig)
-    fig._config = fig._config | {"displayModeBar": False}
+        fig = bar_figure(
+            traces,
+            f"{categoria}=%{{x}}<br>{col}=%{{y}}<extra></extra>",
+            title_text=title,
+            showlegend=False,
+            legend_tracegroupgap=0,
+            xaxis_title=categoria,
+            yaxis_title=col,
+        )
     if seleccion == "General":
         fig.add_hline(y=objective, line_dash="dash")
     return fig
 
 
-def fig_bar_acceso(df: pd.DataFrame, categoria: str) -> Figure:
+def fig_bar_acceso(traces: list[dict], categoria: str) -> Figure:
     """ Crea una figura de barras con el avance de los alumnos de cuarto. """
-    fig = px.bar(
-        df,
-        x=categoria,
-        y=["Pruebas_Grado_Profesional", "Avance_Grado_Profesional"],
+    return bar_figure(
+        traces,
+        f"Tipo={{name}}<br>{categoria}=%{{x}}<br>Porcentaje de Alumnos de Cuarto=%{{y}}<extra></extra>",
         barmode="group",
-        labels={
-            "value": "Porcentaje de Alumnos de Cuarto",
-            "variable": "Tipo",
-            "Año_Curso": "Curso",
-        },
-    )
-    fig.for_each_trace(lambda t: t.update(name=t.name.replace("_", " ")))
-    fig.update_layout(
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",  # Anclarla en la parte inferior
-            y=1.02,
-            xanchor="left",
-            x=0,
-        )
+        legend=legend_top | {"title_text": "Tipo", "tracegroupgap": 0},
+        margin=dict(t=60),
+        xaxis_title=categoria,
+        yaxis_title="Porcentaje de Alumnos de Cuarto",
     )
-    return fig
 
 
-def fig_bar_satisfaccion(df: pd.DataFrame, categoria: str) -> Figure:
+def fig_bar_satisfaccion(traces: list[dict], categoria: str) -> Figure:
     """ Crea una figura de barras con la satisfacción de los alumnos. """
-    df = (
-        df.groupby([categoria, "Satisfaccion"], observed=False)["ID_Alumno"]
-        .count()
-        .sort_index()
-        .reset_index()
-    )
-    df["Porcentaje"] = df.groupby([categoria], observed=False)["ID_Alumno"].transform(
-        lambda x: x / x.sum() * 100
-    )
-    orden_satisfaccion = [5, 4, 3, 2, 1]  # Orden deseado
-    df["Satisfaccion"] = pd.Categorical(
-        df["Satisfaccion"], categories=orden_satisfaccion, ordered=True
+    return bar_figure(
+        traces,
+        f"Nivel de Satisfacción={{name}}<br>{categoria}=%{{x}}<br>Porcentaje=%{{y:.2f}}<extra></extra>",
+        **satisfaction_layout(categoria),
     )
-    df = df.sort_values([categoria, "Satisfaccion"], ascending=True)
-    fig = px.bar(
-        df,
-        x=categoria,
-        y="Porcentaje",
-        color=df["Satisfaccion"].astype(str),
-        barmode="stack",
-        # Puedes asignar tus colores de satisfacción
-        color_discrete_map={
-            "1": "rgb(255,0,0)",  # Rojo intenso
-            "2": "rgb(255,102,102)",  # Rojo más claro
-            "3": "rgb(255,255,102)",  # Amarillo
-            "4": "rgb(144,238,144)",  # Verde claro
-            "5": "rgb(0,128,0)",  # Verde intenso
-        },
-        labels={
-            "Año_Curso": "Curso",
-            "color": "Nivel de Satisfacción",
-            "Porcentaje": "Porcentaje",
-        },
-        hover_data={
-            "Satisfaccion": False,
-            categoria: False,
-            "Porcentaje": ":.2f",
-        },
-    )
-
-    # 4. Ajustamos el layout si queremos
-    fig.update_layout(yaxis_title="Porcentaje", xaxis_title=categoria, showlegend=False)
-    return fig
 
 
-def figure_text(texto: str, size: int = 24) -> FigureWidget:
+def figure_text(texto: str, size: int = 24) -> Figure:
     """ Crea una figura con un texto centrado. """
-    # Creamos un DataFrame mínimo con una sola fila
-    df_text = pd.DataFrame({
-        "x": [0],
-        "y": [0],
-        "texto": [texto],
-    })
-
-    # Generamos una figura scatter usando la columna 'texto'
-    fig = px.scatter(
-        df_text,
-        x="x",
-        y="y",
-        text="texto",
-    )
-
-    # Ajustes para ocultar todo excepto el texto
-    fig.update_traces(
-        textposition="middle center", marker_opacity=0, textfont=dict(size=size)
-    )
-    # Centrar texto
-    fig.update_xaxes(
-        visible=False,
-        range=[-1, 1],
-    )
-    fig.update_yaxes(visible=False, range=[-1, 1])
-    fig.update_layout(
-        margin=dict(l=0, r=0, t=0, b=0),
-        plot_bgcolor="white",
+    # Un único punto invisible con el texto
+    fig = Figure(
+        Scatter(
+            x=[0],
+            y=[0],
+            text=[texto],
+            mode="text",
+            textposition="middle center",
+            textfont=dict(size=size),
+            hoverinfo="skip",
+        ),
+        layout=dict(
+            # Ocultar los ejes y centrar el texto
+            xaxis=dict(visible=False, range=[-1, 1]),
+            yaxis=dict(visible=False, range=[-1, 1]),
+            margin=dict(l=0, r=0, t=0, b=0),
+            plot_bgcolor="white",
+            showlegend=False,
+        ),
     )
-
-    fig = FigureWidget(fig)
     fig._config = fig._config | {"displayModeBar": False, "staticPlot": True}
     return fig
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from shiny.express import wrap_express_app
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Mount, Route
+
+from metrics import metrics_text
+from warmup import warmup
+
+# Aplicación Shiny Express, montada junto a la ruta de métricas
+shiny_app = wrap_express_app(Path(__file__).parent / "app.py")
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """ Publica las latencias, las sesiones y las cachés en el formato de Prometheus. """
+    return PlainTextResponse(metrics_text(), media_type="text/plain; version=0.0.4")
+
+
+async def ready(request: Request) -> JSONResponse:
+    """ Indica si la precarga de la vista inicial ha terminado: 503 mientras no lo haga. """
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+# Se arranca con `uvicorn server:app`
+app = Starlette(
+    routes=[
+        Route("/metrics", metrics),
+        Route("/ready", ready),
+        Mount("/", app=shiny_app),
+    ]
+)
@@ -1,35 +1,381 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from pathlib import Path
-
+from typing import Any, Callable, Generic, ParamSpec, TypeVar
+import asyncio
+import contextvars
+import functools
+import hashlib
+import os
+import threading
+
+import numpy as np
 import pandas as pd
-from shiny import reactive
+from shiny import reactive, req
 from shiny.express import input
+from shiny.session import get_current_session
+from shiny.types import SafeException
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,  # muestra mensajes de nivel INFO o superior
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+from cohort import band_cube, build_cohorts, merge_cohorts
+from cube import build_cube, merge_cubes, rollup, term_cube, term_keys
+from metrics import register_stats, timed
+from sqlstore import SqlStore
+from snapshot import (
+    align_categories,
+    read_csv,
+    read_snapshot,
+    schema_file,
+    snapshot_meta,
+    validate_batch,
 )
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+P = ParamSpec("P")
+
 app_dir = Path(__file__).parent
+dataset_path = app_dir / "dataset.csv"
+snapshot_path = app_dir / "dataset.snapshot"
+
+# Despliegue con varios workers: cada uno mapea en memoria el snapshot que publica
+# deploy.py en lugar de leer su propia copia, así que comparten las páginas del dataset
+shared_dataset = os.environ.get("DASHBOARD_SHARED_DATASET") == "1"
+
+# Backend de consultas: "pandas" carga el dataset y filtra el cubo en memoria;
+# "sqlite" consulta el cubo indexado de dataset.db (python sqlstore.py) sin cargar
+# el dataset, para datasets que no caben en memoria
+backend = os.environ.get("DASHBOARD_BACKEND", "pandas")
+database_path = app_dir / "dataset.db"
+
+# Columnas con índice de filas para filtrar por categoría
+index_cols = ["Curso", "Asignatura", "Profesor", "Instrumento"]
+
+# El dataset se comparte entre sesiones: con copy-on-write ninguna sesión puede
+# modificar por accidente el DataFrame común al trabajar sobre una vista suya.
+# Desde pandas 3 siempre está activo y la opción está obsoleta
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def dataset_source(csv_path: Path, snap_path: Path) -> Path:
+    """ Elige el snapshot columnar si existe y es más reciente que el CSV. """
+    snap_schema = snap_path / schema_file
+    if not snap_schema.exists():
+        return csv_path
+    if csv_path.exists() and csv_path.stat().st_mtime_ns > snap_schema.stat().st_mtime_ns:
+        return csv_path
+    return snap_path
+
+
+def read_dataset(path: Path, mmap: bool = False) -> pd.DataFrame:
+    """ Lee y tipa el dataset desde un snapshot, mapeado en memoria si se indica, o desde el CSV. """
+    if path.is_dir():
+        return read_snapshot(path, mmap=mmap)
+    return read_csv(path)
+
+
+def file_hasher(path: Path) -> "hashlib.blake2b":
+    """ Calcula el hash del contenido de un fichero, ampliable si se le añaden datos. """
+    hasher = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            hasher.update(chunk)
+    return hasher
+
+
+def file_digest(path: Path) -> str:
+    """ Calcula el hash del contenido de un fichero. """
+    return file_hasher(path).hexdigest()
+
+
+class DatasetCache:
+    """ Copia única del dataset por proceso, recargada solo si cambia el fichero. """
+
+    def __init__(self, path: Path, snapshot: Path, mmap: bool = False):
+        self.path = path
+        self.snapshot = snapshot
+        self.mmap = mmap
+        self.version = 0
+        self.nbytes = 0
+        self._frame: pd.DataFrame | None = None
+        self._stat: tuple[Path, int, int] | None = None
+        self._digest: str | None = None
+        self._hasher: "hashlib.blake2b | None" = None
+        self._lock = threading.Lock()
+
+    def _signature(self) -> tuple[Path, int, int]:
+        source = dataset_source(self.path, self.snapshot)
+        stat = (source / schema_file if source.is_dir() else source).stat()
+        return source, stat.st_mtime_ns, stat.st_size
+
+    def get(self) -> tuple[pd.DataFrame, int]:
+        """ Devuelve el dataset y su versión, recargándolo si el fichero ha cambiado. """
+        signature = self._signature()
+        frame = self._frame
+        if frame is not None and signature == self._stat:
+            return frame, self.version
+        with self._lock:
+            if self._frame is not None and signature == self._stat:
+                return self._frame, self.version
+            # mtime o tamaño distintos: solo recargamos si cambia el contenido
+            source = signature[0]
+            if source.is_dir():
+                hasher, digest = None, snapshot_meta(source)["digest"]
+            else:
+                hasher = file_hasher(source)
+                digest = hasher.hexdigest()
+            if self._frame is None or digest != self._digest:
+                self._frame = read_dataset(source, mmap=self.mmap)
+                self._digest = digest
+                self.version += 1
+                self.nbytes = int(self._frame.memory_usage(deep=True).sum())
+                logger.info(
+                    "Dataset cargado desde %s (versión %d, %d filas, %.1f MB)",
+                    source.name, self.version, len(self._frame), self.nbytes / 2**20,
+                )
+            self._stat = signature
+            self._hasher = hasher
+            return self._frame, self.version
+
+    def append(self, batch: pd.DataFrame, persist: bool = False) -> int:
+        """ Añade un lote ya validado al dataset en memoria y devuelve la nueva versión. """
+        with self._lock:
+            if self._frame is None:
+                raise RuntimeError("El dataset no está cargado")
+            if persist:
+                self._append_csv(batch)
+            frame, batch = align_categories(self._frame, batch)
+            self._frame = pd.concat([frame, batch], ignore_index=True)
+            self.version += 1
+            self.nbytes = int(self._frame.memory_usage(deep=True).sum())
+            logger.info(
+                "Lote de %d filas incorporado (versión %d, %d filas)",
+                len(batch), self.version, len(self._frame),
+            )
+            return self.version
+
+    def current(self) -> pd.DataFrame | None:
+        """ Obtiene el dataset ya cargado, sin comprobar si el fichero ha cambiado. """
+        return self._frame
+
+    def changed(self) -> bool:
+        """ Indica si el fichero ha cambiado desde la última carga, sin cargarlo. """
+        return self._frame is not None and self._signature() != self._stat
+
+    def _append_csv(self, batch: pd.DataFrame) -> None:
+        """ Añade el lote al final del CSV sin que cuente como un cambio externo. """
+        if self._stat is None or self._stat[0] != self.path or self._hasher is None:
+            raise ValueError("Solo se puede persistir un lote cuando el dataset se carga del CSV")
+        columns = pd.read_csv(self.path, nrows=0).columns
+        content = batch[columns].to_csv(index=False, header=False, date_format="%Y-%m-%d")
+        content = content.encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(content)
+        # Actualizamos firma y hash con lo añadido para no releer el histórico
+        self._hasher.update(content)
+        self._digest = self._hasher.hexdigest()
+        self._stat = self._signature()
+
+    def stats(self) -> dict[str, int]:
+        """ Obtiene la versión, las filas y los bytes del dataset cargado, sin recargarlo. """
+        frame = self._frame
+        return {
+            "version": self.version,
+            "rows": 0 if frame is None else len(frame),
+            "bytes": self.nbytes,
+        }
+
+
+_dataset = DatasetCache(dataset_path, snapshot_path, mmap=shared_dataset)
+register_stats("dashboard_dataset", _dataset.stats, "Dataset cargado en el proceso.")
+
+
+_store = SqlStore(database_path) if backend == "sqlite" else None
+
+
+def load_dataset() -> pd.DataFrame:
+    """ Obtiene el dataset compartido del proceso. No debe modificarse. """
+    return _dataset.get()[0]
+
+
+def dataset_version() -> int:
+    """ Obtiene la versión del dataset, que cambia cada vez que se recarga. """
+    if _store is not None:
+        return _store.get_version()
+    return _dataset.get()[1]
+
+
+def current_version() -> int:
+    """ Obtiene la versión del dataset ya cargada, sin comprobar si su fichero ha cambiado. """
+    if _store is not None:
+        return _store.version
+    return _dataset.version
+
+
+# Resultados derivados que se actualizan al incorporar lotes
+_derived: list["VersionCache[Any]"] = []
+
+
+class VersionCache(Generic[T]):
+    """ Resultado derivado del dataset, recalculado solo cuando cambia su versión. """
+
+    def __init__(
+        self,
+        build: Callable[[pd.DataFrame], T],
+        merge: Callable[[T, pd.DataFrame], T | None] | None = None,
+    ):
+        self._build = build
+        self._merge = merge
+        # Versión y resultado juntos, para leerlos sin el cerrojo
+        self._entry: tuple[int, T] | None = None
+        self._lock = threading.Lock()
+        if merge is not None:
+            _derived.append(self)
+
+    def get(self) -> T:
+        df, version = _dataset.get()
+        entry = self._entry
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._lock:
+            if self._entry is None or self._entry[0] != version:
+                self._entry = (version, self._build(df))
+            return self._entry[1]
+
+    def merged(self, version: int, batch: pd.DataFrame) -> T | None:
+        """ Calcula el resultado tras añadir un lote, si está al día con la versión dada.
+        Es None si no lo está o si el lote obliga a recalcularlo entero. """
+        with self._lock:
+            if self._merge is None or self._entry is None or self._entry[0] != version:
+                return None
+            return self._merge(self._entry[1], batch)
+
+    def publish(self, version: int, value: T) -> None:
+        """ Guarda el resultado calculado para una versión. """
+        with self._lock:
+            self._entry = (version, value)
+
+
+class FrameIndex:
+    """ Índices de posiciones de filas de un DataFrame para filtrarlo sin recorrerlo. """
+
+    def __init__(self, frame: pd.DataFrame, columns: list[str] = index_cols):
+        self.frame = frame
+        fechas = frame["Fecha"].to_numpy()
+        self.sorted = bool(frame["Fecha"].is_monotonic_increasing)
+        self.order = np.arange(len(frame)) if self.sorted else np.argsort(fechas, kind="stable")
+        self.fechas = fechas[self.order]
+        # Para cada valor, sus posiciones en orden creciente
+        self.positions: dict[str, dict[str, np.ndarray]] = {}
+        for col in columns:
+            codes, uniques = pd.factorize(frame[col], sort=True)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.positions[col] = {
+                value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)
+            }
 
+    def rows(self, date: datetime, category: str, selected: str) -> np.ndarray | slice | None:
+        """ Obtiene las filas posteriores a la fecha con la categoría seleccionada. """
+        start = int(np.searchsorted(self.fechas, np.datetime64(date), side="left"))
+        if selected == "General":
+            return slice(start, None) if self.sorted else np.sort(self.order[start:])
+        if category not in self.positions:
+            return None
+        positions = self.positions[category].get(selected, np.empty(0, dtype=np.intp))
+        if self.sorted:
+            return positions[np.searchsorted(positions, start):]
+        return np.intersect1d(self.order[start:], positions, assume_unique=True)
 
-@reactive.calc
-def data() -> pd.DataFrame:
-    """ Obtiene los datos del dataset. """
-    
-    df = pd.read_csv(app_dir / "dataset.csv", parse_dates=["Fecha"])
-    df["Año_Curso"] = pd.Categorical(
-            df["Año_Curso"], categories=df["Año_Curso"].unique().sort(), ordered=True # type: ignore
-    )
-    df["Trimestre"] = pd.Categorical(
-        df["Trimestre"],
-        categories=[1, 2, 3],  # o las que correspondan
-        ordered=True,
-    )
-    return df
+
+def build_cube_index(df: pd.DataFrame) -> FrameIndex:
+    """ Construye el cubo de métricas junto con sus índices de filtrado. """
+    return FrameIndex(build_cube(df))
+
+
+def merge_cube_index(index: FrameIndex, batch: pd.DataFrame) -> FrameIndex:
+    """ Añade un lote al cubo de métricas y reconstruye sus índices. """
+    return FrameIndex(merge_cubes(index.frame, build_cube(batch)))
+
+
+_cube = VersionCache(build_cube_index, merge_cube_index)
+
+
+def load_cube() -> pd.DataFrame:
+    """ Obtiene el cubo de métricas de la versión actual del dataset. """
+    return _cube.get().frame
+
+
+def load_cube_index() -> FrameIndex:
+    """ Obtiene los índices de filtrado del cubo de métricas actual. """
+    return _cube.get()
+
+
+_terms = VersionCache(lambda df: term_cube(load_cube()))
+
+# Índice de alumnos: sus hitos solo pueden adelantarse con un lote, así que se combinan
+_cohorts = VersionCache(
+    build_cohorts, lambda cohorts, batch: merge_cohorts(cohorts, build_cohorts(batch))
+)
+
+
+def load_cohorts() -> pd.DataFrame:
+    """ Obtiene el índice longitudinal de alumnos de la versión actual del dataset. """
+    return _cohorts.get()
+
+
+def merge_band_index(index: FrameIndex, batch: pd.DataFrame) -> FrameIndex | None:
+    """ Añade al cubo de la banda las filas de tercer año de un lote y reconstruye sus índices. """
+    # Solo hacen falta los hitos de los alumnos del lote, combinados con los que ya tenían
+    cohorts = load_cohorts()
+    students = cohorts.index.intersection(pd.Index(batch["ID_Alumno"].unique()))
+    before = cohorts.loc[students, "Primera_Banda"]
+    merged = merge_cohorts(cohorts.loc[students], build_cohorts(batch))
+    # Un lote con trimestres ya pasados puede adelantar la primera banda de un alumno y
+    # cambiar el acceso de filas ya contadas: entonces el cubo se recalcula entero
+    after = merged["Primera_Banda"].reindex(students)
+    moved = after[after.notna() & (before.isna() | (after < before))]
+    if len(index.fechas) and (moved <= pd.Timestamp(index.fechas[-1])).any():
+        return None
+    return FrameIndex(merge_cubes(index.frame, band_cube(batch, merged)))
+
+
+_band = VersionCache(
+    lambda df: FrameIndex(band_cube(df, load_cohorts())), merge_band_index
+)
+
+
+def load_band_index() -> FrameIndex:
+    """ Obtiene el cubo del acceso a la banda en tercer año con sus índices de filtrado. """
+    return _band.get()
+
+
+def load_terms() -> pd.DataFrame:
+    """ Obtiene el resumen del cubo por trimestre y nivel. """
+    if _store is not None:
+        return _store.terms()
+    return _terms.get()
+
+
+_ingest_lock = threading.Lock()
+
+
+def ingest_batch(batch: pd.DataFrame, persist: bool = False) -> int:
+    """ Incorpora un lote de filas nuevas al dataset y sus agregados sin recargar el histórico. """
+    if _store is not None:
+        raise RuntimeError("La ingesta de lotes solo está disponible con el backend pandas")
+    batch = validate_batch(batch)
+    with _ingest_lock:
+        version = dataset_version()
+        # Los agregados se actualizan con el lote; los que no estén al día se recalcularán
+        updates = [(cache, cache.merged(version, batch)) for cache in _derived]
+        new_version = _dataset.append(batch, persist=persist)
+        for cache, value in updates:
+            if value is not None:
+                cache.publish(new_version, value)
+    return new_version
 
 
 def filter_data(
@@ -37,8 +383,15 @@ def filter_data(
     date: datetime,
     category: str = "General",
     selected: str = "General",
+    index: FrameIndex | None = None,
 ) -> pd.DataFrame | None:
     """ Filtra los datos según los parámetros seleccionados. """
+    # Con un índice del propio DataFrame el coste depende del tamaño del resultado
+    if index is not None and index.frame is df:
+        rows = index.rows(date, category, selected)
+        if rows is None:
+            return None
+        return df.iloc[rows]
     df = df[df["Fecha"] >= date] # type: ignore
     if selected == "General":
         return df
@@ -46,11 +399,237 @@ def filter_data(
         df = df[df[category] == selected] # type: ignore
     except Exception:
         return None
-    df["Año_Curso"] = df["Año_Curso"].cat.remove_unused_categories()
-    df["Trimestre"] = df["Trimestre"].cat.remove_unused_categories()
     return df
 
 
+def load_filtered(
+    date: datetime,
+    category: str = "General",
+    selected: str = "General",
+    by: list[str] | None = None,
+    band: bool = False,
+) -> pd.DataFrame | None:
+    """ Filtra el cubo de métricas, o con band el del acceso a la banda, sin contexto reactivo. """
+    if _store is not None:
+        table = "cubo_banda" if band else "cubo"
+        return _store.filter_cube(date, category, selected, by, table=table)
+    index = load_band_index() if band else load_cube_index()
+    return filter_data(index.frame, date, category, selected, index=index)
+
+
+def period_keys(category: str) -> list[str]:
+    """ Obtiene las claves por las que agrupa la comparativa de una categoría. """
+    if category in term_keys or category == "General":
+        return term_keys
+    return term_keys + [category]
+
+
+def versioned(fn: Callable[..., T], *args) -> tuple[int, T]:
+    """ Ejecuta fn(*args) y devuelve su resultado junto con la versión del dataset de la que parte. """
+    # La versión se lee antes de cargar: los datos son de esa versión o de una posterior
+    version = current_version()
+    return version, fn(*args)
+
+
+def view_key(
+    chart: str,
+    trim_start: str,
+    course_start: str,
+    category: str,
+    selected: str,
+    versions: tuple[int, int],
+    tipo: str | None = None,
+) -> tuple:
+    """ Obtiene la clave de la caché de figuras de una gráfica con unos filtros, creada con
+    las tablas y los objetivos de las versiones del dataset indicadas. """
+    return (
+        chart,
+        trim_start,
+        course_start,
+        category,
+        selected,
+        tipo,
+        versions,
+        date.today(),
+    )
+
+
+# Pool de hilos del proceso para los cálculos de las tarjetas: una sesión con un periodo
+# largo no bloquea el bucle de eventos que atiende al resto. Los hilos acotan cuántos
+# cálculos se hacen a la vez y los demás esperan en la cola. Crear las figuras es sobre
+# todo Python y compite por el GIL con el bucle: más hilos que núcleos no acelera nada
+# y retrasa al resto de sesiones
+pool_workers = int(os.environ.get("DASHBOARD_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+_pool = ThreadPoolExecutor(max_workers=pool_workers, thread_name_prefix="dashboard")
+_pool_counts = {"submitted": 0, "cancelled": 0}
+
+
+async def run_in_pool(fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+    """ Ejecuta una función en el pool de hilos sin bloquear el bucle de eventos. """
+    # El hilo hereda el contexto, y con él el output al que se atribuyen sus fases
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    _pool_counts["submitted"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool, call)
+    except asyncio.CancelledError:
+        # Si aún no había empezado, el cálculo sale de la cola sin ejecutarse
+        _pool_counts["cancelled"] += 1
+        raise
+
+
+def pool_stats() -> dict[str, int]:
+    """ Obtiene los contadores del pool de hilos. """
+    return {"workers": pool_workers, **_pool_counts}
+
+
+register_stats(
+    "dashboard_pool",
+    pool_stats,
+    "Cálculos de las tarjetas en el pool de hilos.",
+    counters={"submitted", "cancelled"},
+)
+
+
+_reload: Future | None = None
+_reload_lock = threading.Lock()
+# Resultado de la última carga: la versión cargada y, si falló, el error. El sondeo
+# depende de él, así que al terminar una carga se repite sin esperar al intervalo
+_reload_state: reactive.Value[tuple[int, str | None]] = reactive.value((0, None))
+# Firma del fichero con el que falló la carga, para reintentarla solo si cambia
+_failed_signature: tuple | None = None
+
+
+def _source_signature() -> tuple:
+    """ Obtiene la firma del fichero de datos, o una tupla vacía si no existe. """
+    try:
+        return _dataset._signature()
+    except FileNotFoundError:
+        return ()
+
+
+def reload_dataset() -> None:
+    """ Carga el dataset, o relee la base de datos, si su fichero ha cambiado. """
+    global _failed_signature
+    try:
+        dataset_version()
+    except Exception:
+        _failed_signature = _source_signature()
+        logger.exception("No se ha podido cargar el dataset")
+        raise
+    _failed_signature = None
+
+
+async def _publish_reload(reload: Future) -> None:
+    """ Publica a las sesiones el resultado de una carga terminada. """
+    error = reload.exception()
+    async with reactive.lock():
+        _reload_state.set((current_version(), None if error is None else str(error)))
+        await reactive.flush()
+
+
+def request_reload() -> None:
+    """ Lanza la carga del dataset en el pool de hilos sin esperarla, si no hay ya una en curso.
+    Al terminar, las sesiones que esperan los datos se actualizan sin esperar al sondeo. """
+    global _reload
+    with _reload_lock:
+        if _reload is not None and not _reload.done():
+            return
+        _reload = _pool.submit(reload_dataset)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Fuera del bucle de eventos no hay sesiones a las que avisar
+        return
+    _reload.add_done_callback(
+        lambda reload: asyncio.run_coroutine_threadsafe(_publish_reload(reload), loop)
+    )
+
+
+def dataset_signature() -> tuple[int, str | None]:
+    """ Obtiene la versión ya cargada del dataset y el error de la última carga. Si su fichero
+    ha cambiado, la recarga se hace en el pool de hilos y la versión nueva llega al terminar. """
+    _, error = _reload_state()
+    if _store is None and _failed_signature is not None:
+        # La carga falló: se reintenta cuando el fichero aparece o cambia
+        if _source_signature() != _failed_signature:
+            request_reload()
+        return current_version(), error
+    source = _store if _store is not None else _dataset
+    try:
+        changed = source.changed()
+    except FileNotFoundError:
+        # Sin fichero no hay nada que recargar: el error llega con la siguiente carga
+        changed = False
+    if changed:
+        request_reload()
+    return current_version(), error
+
+
+# El sondeo no lee ni carga ficheros en el bucle de eventos: importar el módulo no
+# lee el dataset, y cargarlo o recargarlo bloquea un hilo del pool, no a las sesiones
+@reactive.poll(dataset_signature, interval_secs=5, session=None)
+@timed("aggregation")
+def data() -> pd.DataFrame | None:
+    """ Obtiene los datos del dataset ya cargado. Con el backend sqlite no se cargan y es None. """
+    if _store is not None:
+        return None
+    with reactive.isolate():
+        _, error = _reload_state()
+    frame = _dataset.current()
+    if frame is None:
+        if error is not None:
+            raise SafeException(f"No se ha podido cargar el dataset: {error}")
+        # Los outputs esperan a que la precarga o el pool carguen el dataset
+        request_reload()
+        req(False, cancel_output="progress")
+    return frame
+
+
+class PooledTasks:
+    """ Cálculos de una sesión en el pool de hilos, cada uno en una ranura con nombre.
+    Al pedir otra clave en una ranura se cancela el cálculo anterior, que ya no se mostraría. """
+
+    def __init__(self):
+        self._tasks: dict[str, reactive.ExtendedTask] = {}
+        self._keys: dict[str, tuple] = {}
+        session = get_current_session()
+        if session is not None and not session.is_stub_session():
+            session.on_ended(self.cancel)
+
+    def __call__(self, slot: str, key: tuple, fn: Callable[..., T], *args) -> T:
+        """ Obtiene el resultado de fn(*args) para la clave. Mientras se calcula, los outputs
+        que lo leen conservan su valor y se actualizan al terminar. """
+        task = self._tasks.get(slot)
+        if task is None:
+            task = self._tasks[slot] = reactive.ExtendedTask(run_in_pool)
+        if self._keys.get(slot) != key:
+            task.cancel()
+            task.invoke(fn, *args)
+            self._keys[slot] = key
+        # Una ejecución cancelada siempre tiene detrás la de la clave nueva
+        if task.status() == "cancelled":
+            req(False, cancel_output="progress")
+        return task.result()
+
+    def cancel(self) -> None:
+        """ Cancela todos los cálculos de la sesión, por ejemplo al cerrarse. """
+        for task in self._tasks.values():
+            task.cancel()
+
+
+def dataset_choices(category: str) -> list[str]:
+    """ Obtiene las opciones del filtro seleccionado en el dataset o en la base de datos. """
+    if _store is None:
+        return select_choices(data(), category)  # type: ignore
+    if category not in map_filter_cols:
+        raise ValueError("Not a filter")
+    data()
+    if category == "General":
+        return ["General"]
+    return ["General"] + _store.categories(category)
+
+
 filter_options = [
     "General",
     "Curso",
@@ -79,6 +658,10 @@ tipo_col = {
     "Satisfacción": "Satisfaccion",
 }
 
+# Tipos cuya comparativa sale del cubo del acceso a la banda, como su tarjeta, y no de
+# la columna Banda del cubo de métricas, que cuenta a todos los alumnos
+band_types = {"Acceso a banda"}
+
 map_filter_cols = {
     "General": None,
     "Curso": "Año_Curso",
@@ -98,13 +681,21 @@ map_objective = {
 }
 
 
-@reactive.calc
-def get_objectives() -> dict[str, float] | None:
-    """ Obtiene los objetivos calculados a partir de los datos filtrados. """
-    
-    df = data().copy()
-    start_time = datetime.today() - timedelta(days=2 * 365)
-    df = filter_data(df, start_time)
+# Objetivos por (versión del dataset, fecha de referencia), comunes a todas las sesiones
+_objectives: dict[tuple[int, date], dict[str, float] | None] = {}
+_objectives_lock = threading.Lock()
+# Los objetivos pueden ser None si no hay datos suficientes
+_missing = object()
+
+
+def compute_objectives(
+    reference: date, terms: pd.DataFrame | None = None
+) -> dict[str, float] | None:
+    """ Calcula los objetivos con los dos años anteriores a la fecha de referencia. """
+    start_time = datetime.combine(reference, datetime.min.time()) - timedelta(days=2 * 365)
+    if terms is None:
+        terms = load_terms()
+    df = filter_data(terms, start_time)
     if df is None:
         return None
     objectives = dict()
@@ -113,9 +704,30 @@ def get_objectives() -> dict[str, float] | None:
     return objectives
 
 
+@timed("aggregation")
+def load_objectives(reference: date | None = None) -> dict[str, float] | None:
+    """ Obtiene los objetivos de la versión actual del dataset, calculándolos una sola vez. """
+    reference = reference or date.today()
+    key = (dataset_version(), reference)
+    # Una sola lectura: otra versión puede borrar la clave al guardar la suya
+    objectives = _objectives.get(key, _missing)
+    if objectives is not _missing:
+        return objectives  # type: ignore
+    with _objectives_lock:
+        if key not in _objectives:
+            # Solo conservamos los objetivos de la versión actual
+            for old in [k for k in _objectives if k[0] != key[0]]:
+                del _objectives[old]
+            _objectives[key] = compute_objectives(reference)
+        return _objectives[key]
+
+
 @reactive.calc
 def courses_df() -> list:
     """ Obtiene los cursos disponibles en el dataset. """
+    if _store is not None:
+        data()
+        return _store.categories("Año_Curso")[::-1]
     return data()["Año_Curso"].sort_values(ascending=False).unique().tolist()  # type: ignore
 
 
@@ -176,17 +788,13 @@ def course_to_date(trim: int | str, course: str) -> datetime:
 
 
 def calculate_objective(objective: str | float, data: pd.DataFrame, col: str) -> float:
-    """ Calcula el objetivo a partir de los datos filtrados. """
+    """ Calcula el objetivo a partir del cubo de métricas filtrado. """
     if type(objective) is not str:
         return float(objective)
     amount = float(objective) + 1
     match col:
         case "Aprobado":
-            prev = (
-                data.groupby(["Año_Curso", "Trimestre"], observed=True)[col]
-                .mean()
-                .sort_index()
-            ).iloc[-2]
+            prev = rollup(data, ["Año_Curso", "Trimestre"], [col])[col].iloc[-2]
             return prev * amount
 
         case "Avance_Grado_Profesional":
@@ -196,18 +804,14 @@ def calculate_objective(objective: str | float, data: pd.DataFrame, col: str) ->
             df = df[df["Trimestre"] == 3]
             if len(df) == 0:
                 return 0
-            prev = (
-                df.groupby("Año_Curso", observed=True)["Avance_Grado_Profesional"]
-                .apply(lambda x: x.sum() / x.count())
-                .iloc[-2]
-            )
+            prev = rollup(df, "Año_Curso", [col])[col].iloc[-2]
             return prev * amount
         case _:
             raise ValueError("Columna no implementada")
 
 
 if __name__ == "__main__":
-    df = data()
-    print(calculate_objective("-0.2", data(), "Aprobado"))
-    print(calculate_objective("+0.2", data(), "Aprobado"))
-    print(data())
+    df = load_cube()
+    print(calculate_objective("-0.2", df, "Aprobado"))
+    print(calculate_objective("+0.2", df, "Aprobado"))
+    print(df)
@@ -0,0 +1,228 @@
+import argparse
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Tipos de cada columna del dataset. Las categorías se guardan como códigos
+# enteros y los booleanos como tales, así que leer un snapshot no necesita
+# inferir tipos ni volver a categorizar. Los enteros y reales usan el tipo más
+# pequeño que admite sus valores: las métricas se pasan a float64 al agregarlas.
+schema = {
+    "ID_Alumno": "int32",
+    "Fecha": "datetime64[ns]",
+    "Curso": "category",
+    "Años_Inscrito": "int8",
+    "Año_Curso": "category",
+    "Trimestre": "category",
+    "Banda": "bool",
+    "Asignatura": "category",
+    "Instrumento": "category",
+    "Profesor": "category",
+    "Aprobado": "bool",
+    "Horas_Practica": "int8",
+    "Satisfaccion": "int8",
+    "Abandono_Educacion": "bool",
+    "Pruebas_Grado_Profesional": "bool",
+    "Avance_Grado_Profesional": "bool",
+    "Promedio_Asistencia": "float32",
+}
+
+# Categorías ordenadas, con sus valores fijos si los tienen
+ordered_categories = {
+    "Año_Curso": None,
+    "Trimestre": [1, 2, 3],
+}
+
+schema_file = "schema.json"
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """ Convierte las columnas de un DataFrame a los tipos del esquema. """
+    for col, dtype in schema.items():
+        if dtype.startswith("int"):
+            # Un valor fuera del rango del tipo compacto se convertiría en otro
+            info = np.iinfo(dtype)
+            if len(df) and (df[col].min() < info.min or df[col].max() > info.max):
+                raise ValueError(f"{col} tiene valores fuera del rango de {dtype}")
+        if dtype != "category":
+            df[col] = df[col].astype(dtype)  # type: ignore
+            continue
+        categories = ordered_categories.get(col)
+        if col in ordered_categories:
+            if categories is None:
+                categories = sorted(df[col].unique())
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                # Un lote recortado conserva categorías sin uso: se reasignan sin recategorizar
+                df[col] = df[col].cat.set_categories(categories, ordered=True)
+            else:
+                # Los valores fuera de las categorías fijas quedan vacíos sin pasar por pandas
+                values = df[col].where(df[col].isin(categories))
+                df[col] = pd.Categorical(values, categories=categories, ordered=True)
+        elif not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def validate_batch(batch: pd.DataFrame) -> pd.DataFrame:
+    """ Comprueba que un lote de filas sigue el esquema del dataset y lo convierte a sus tipos. """
+    missing = set(schema) - set(batch.columns)
+    extra = set(batch.columns) - set(schema)
+    if missing or extra:
+        raise ValueError(
+            f"Columnas no válidas: faltan {sorted(missing)}, sobran {sorted(extra)}"
+        )
+    batch = batch[list(schema)].copy()
+    if batch.isna().any().any():
+        raise ValueError("El lote contiene valores vacíos")
+    try:
+        batch["Fecha"] = pd.to_datetime(batch["Fecha"])
+        batch = apply_schema(batch)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"El lote no sigue el esquema: {e}") from e
+    # Las categorías fijas convierten los valores desconocidos en vacíos
+    for col, categories in ordered_categories.items():
+        if categories is not None and batch[col].isna().any():
+            raise ValueError(f"{col} solo admite los valores {categories}")
+    return batch
+
+
+def align_categories(*frames: pd.DataFrame) -> list[pd.DataFrame]:
+    """ Unifica las categorías de varios DataFrames para poder concatenarlos sin perder el tipo. """
+    aligned = list(frames)
+    for col, dtype in schema.items():
+        if dtype != "category" or col not in aligned[0]:
+            continue
+        categories = [df[col].cat.categories for df in aligned]
+        if all(c.equals(categories[0]) for c in categories):
+            continue
+        union = sorted(set().union(*categories))
+        aligned = [df.assign(**{col: df[col].cat.set_categories(union)}) for df in aligned]
+    return aligned
+
+
+def read_csv(path: Path) -> pd.DataFrame:
+    """ Lee el dataset desde un CSV y lo convierte al esquema. """
+    # Categorizar tras leer es bastante más rápido que pedir dtype="category" al parser
+    df = pd.read_csv(path, parse_dates=["Fecha"])
+    return apply_schema(df)
+
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    """ Obtiene el entero más pequeño capaz de guardar los códigos. """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def write_snapshot(df: pd.DataFrame, path: Path) -> Path:
+    """ Escribe el DataFrame como snapshot columnar: un .npy por columna y un esquema. """
+    df = apply_schema(df.copy())
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    digest = hashlib.blake2b()
+    columns = []
+    for i, col in enumerate(schema):
+        series = df[col]
+        entry: dict = {"name": col, "file": f"{i:02d}.npy", "dtype": schema[col]}
+        if schema[col] == "category":
+            cat = series.cat
+            values = cat.codes.to_numpy().astype(_codes_dtype(len(cat.categories)))
+            entry["categories"] = cat.categories.tolist()
+            entry["ordered"] = bool(cat.ordered)
+        elif schema[col] == "datetime64[ns]":
+            values = series.to_numpy().astype("datetime64[ns]").view(np.int64)
+        else:
+            values = series.to_numpy()
+        values = np.ascontiguousarray(values)
+        np.save(tmp / entry["file"], values, allow_pickle=False)
+        digest.update(values.tobytes())
+        columns.append(entry)
+    meta = {"rows": len(df), "digest": digest.hexdigest(), "columns": columns}
+    # El esquema se escribe el último: su presencia marca el snapshot como completo
+    with open(tmp / schema_file, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    shutil.rmtree(path, ignore_errors=True)
+    tmp.rename(path)
+    return path
+
+
+def snapshot_meta(path: Path) -> dict:
+    """ Lee los metadatos de un snapshot. """
+    with open(path / schema_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_snapshot(path: Path, mmap: bool = False) -> pd.DataFrame:
+    """ Lee un snapshot columnar con los tipos ya resueltos. Con mmap, las columnas son
+    vistas de solo lectura sobre los ficheros, compartidas entre procesos. """
+    meta = snapshot_meta(path)
+    columns = {}
+    for entry in meta["columns"]:
+        values = np.load(
+            path / entry["file"], mmap_mode="r" if mmap else None, allow_pickle=False
+        )
+        match entry["dtype"]:
+            case "category":
+                # Sin validar los códigos, que los escribió write_snapshot: validarlos
+                # recorrería la columna y leería todas sus páginas al cargarla
+                dtype = pd.CategoricalDtype(entry["categories"], ordered=entry["ordered"])
+                columns[entry["name"]] = pd.Categorical.from_codes(
+                    values, dtype=dtype, validate=False  # type: ignore
+                )
+            case "datetime64[ns]":
+                columns[entry["name"]] = values.view("datetime64[ns]")
+            case _:
+                # Los snapshots anteriores a los tipos compactos se convierten al leerlos
+                columns[entry["name"]] = values.astype(schema[entry["name"]], copy=False)
+    return pd.DataFrame(columns, copy=False)
+
+
+def publish_snapshot(csv_path: Path, snap_path: Path) -> bool:
+    """ Escribe el snapshot del CSV si no existe o está desactualizado. Indica si lo ha escrito. """
+    snap_schema = snap_path / schema_file
+    if snap_schema.exists() and (
+        not csv_path.exists() or csv_path.stat().st_mtime_ns <= snap_schema.stat().st_mtime_ns
+    ):
+        return False
+    write_snapshot(read_csv(csv_path), snap_path)
+    return True
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> str:
+    """ Compara la memoria que ocupa cada columna en dos versiones de un DataFrame. """
+    sizes = pd.DataFrame({
+        "antes": before.memory_usage(deep=True, index=False),
+        "después": after.memory_usage(deep=True, index=False),
+    })
+    sizes.loc["Total"] = sizes.sum()
+    sizes["tipo antes"] = before.dtypes.astype(str)
+    sizes["tipo después"] = after.dtypes.astype(str)
+    sizes["ratio"] = (sizes["antes"] / sizes["después"]).round(1)
+    return sizes.fillna("").to_string()
+
+
+if __name__ == "__main__":
+    app_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(
+        description="Convierte el dataset en un snapshot columnar con tipos compactos"
+    )
+    parser.add_argument("origen", type=Path, nargs="?", default=app_dir / "dataset.csv")
+    parser.add_argument("destino", type=Path, nargs="?")
+    parser.add_argument(
+        "--memoria", action="store_true",
+        help="Muestra los bytes por columna del CSV leído sin tipos y con el esquema",
+    )
+    args = parser.parse_args()
+    dst = args.destino or args.origen.with_suffix(".snapshot")
+    raw = pd.read_csv(args.origen, parse_dates=["Fecha"])
+    df = apply_schema(raw.copy())
+    if args.memoria:
+        print(memory_report(raw, df))
+    write_snapshot(df, dst)
+    print(f"Snapshot escrito en {dst}")
@@ -0,0 +1,266 @@
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cohort import band_year
+from cube import cube_keys, cube_metrics, satisfaccion_levels, term_keys
+from snapshot import ordered_categories, schema
+
+# Columnas por las que se filtra el cubo, cada una con su índice junto a Fecha
+category_cols = ["Curso", "Asignatura", "Profesor", "Instrumento"]
+
+# Tipo de cada columna del esquema en SQLite. Las fechas se guardan en nanosegundos
+# y las categorías con su valor, para poder leer el fichero sin el dataset
+sql_types = {
+    "int8": "INTEGER",
+    "int32": "INTEGER",
+    "int64": "INTEGER",
+    "bool": "INTEGER",
+    "datetime64[ns]": "INTEGER",
+    "float32": "REAL",
+    "float64": "REAL",
+    "category": "TEXT",
+}
+
+
+# Tipos de las columnas numéricas del cubo, que un resultado vacío no permite inferir
+cube_dtypes = {
+    **{f"{m}_sum": "float64" for m in cube_metrics},
+    **{f"{m}_count": "int64" for m in cube_metrics},
+    **{f"Satisfaccion_{level}": "int64" for level in satisfaccion_levels},
+}
+
+# Lo mismo para el cubo del acceso a la banda, como cohort.band_cube
+band_dtypes = {"Acceso_Banda_sum": "float64", "Acceso_Banda_count": "int64"}
+
+table_dtypes = {"cubo": cube_dtypes, "cubo_banda": band_dtypes}
+
+
+def _column_type(col: str) -> str:
+    if col == "Trimestre":
+        return "INTEGER"
+    return sql_types[schema[col]]
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def _sql_rows(df: pd.DataFrame) -> list[tuple]:
+    """ Convierte un bloque del dataset en filas con tipos que admite SQLite. """
+    columns = []
+    for col in schema:
+        series = df[col]
+        if schema[col] == "datetime64[ns]":
+            series = series.astype("datetime64[ns]").astype("int64")
+        elif schema[col] == "category":
+            series = series.astype(object)
+        columns.append(series.tolist())
+    return list(zip(*columns))
+
+
+def write_database(csv_path: Path, path: Path, chunksize: int = 500_000) -> Path:
+    """ Carga el CSV por bloques en una base de datos SQLite con el cubo de métricas indexado. """
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        columns = ", ".join(f"{_quote(col)} {_column_type(col)}" for col in schema)
+        conn.execute(f"CREATE TABLE alumnos ({columns})")
+        insert = f"INSERT INTO alumnos VALUES ({', '.join('?' * len(schema))})"
+        # El CSV se lee por bloques: nunca está entero en memoria
+        for chunk in pd.read_csv(csv_path, parse_dates=["Fecha"], chunksize=chunksize):
+            conn.executemany(insert, _sql_rows(chunk[list(schema)]))
+        conn.execute("CREATE INDEX alumnos_fecha ON alumnos (Fecha)")
+        for col in category_cols:
+            conn.execute(f"CREATE INDEX alumnos_{col.lower()} ON alumnos ({_quote(col)}, Fecha)")
+
+        # Mismas columnas y orden que cube.build_cube
+        keys = ", ".join(_quote(key) for key in cube_keys)
+        sums = [f"TOTAL({_quote(m)}) AS {_quote(m + '_sum')}" for m in cube_metrics]
+        counts = [f"COUNT({_quote(m)}) AS {_quote(m + '_count')}" for m in cube_metrics]
+        levels = [
+            f"SUM(Satisfaccion = {level}) AS Satisfaccion_{level}"
+            for level in satisfaccion_levels
+        ]
+        conn.execute(
+            f"CREATE TABLE cubo AS SELECT {keys}, {', '.join(sums + counts + levels)} "
+            f"FROM alumnos GROUP BY {keys} ORDER BY {keys}"
+        )
+        conn.execute("CREATE INDEX cubo_fecha ON cubo (Fecha)")
+        for col in category_cols:
+            conn.execute(f"CREATE INDEX cubo_{col.lower()} ON cubo ({_quote(col)}, Fecha)")
+
+        # Acceso a la banda de los alumnos en su tercer año: cuenta si su primer
+        # trimestre en la banda no es posterior a la fila, como cohort.band_cube
+        conn.execute(
+            f"CREATE TABLE cubo_banda AS SELECT {keys}, "
+            "TOTAL(Fecha >= Primera_Banda) AS Acceso_Banda_sum, "
+            "COUNT(*) AS Acceso_Banda_count "
+            "FROM alumnos LEFT JOIN ("
+            "SELECT ID_Alumno, MIN(Fecha) AS Primera_Banda FROM alumnos "
+            "WHERE Banda GROUP BY ID_Alumno"
+            f") USING (ID_Alumno) WHERE {_quote('Años_Inscrito')} = {band_year} "
+            f"GROUP BY {keys} ORDER BY {keys}"
+        )
+        conn.execute("CREATE INDEX cubo_banda_fecha ON cubo_banda (Fecha)")
+        for col in category_cols:
+            conn.execute(
+                f"CREATE INDEX cubo_banda_{col.lower()} ON cubo_banda ({_quote(col)}, Fecha)"
+            )
+
+        # Categorías del dataset completo, para tipar igual cualquier subconjunto del cubo
+        conn.execute("CREATE TABLE categorias (columna TEXT, posicion INTEGER, valor)")
+        for col, dtype in schema.items():
+            if dtype != "category":
+                continue
+            values = ordered_categories.get(col) or [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT DISTINCT {_quote(col)} FROM alumnos ORDER BY {_quote(col)}"
+                )
+            ]
+            conn.executemany(
+                "INSERT INTO categorias VALUES (?, ?, ?)",
+                [(col, i, value) for i, value in enumerate(values)],
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    tmp.replace(path)
+    return path
+
+
+class SqlStore:
+    """ Cubo de métricas en una base de datos SQLite, consultado sin cargar el dataset. """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.version = 0
+        self._signature: tuple[int, int] | None = None
+        self._categories: dict[str, list] = {}
+        self._terms: pd.DataFrame | None = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _check(self) -> None:
+        """ Detecta si el fichero ha cambiado y, en ese caso, descarta lo leído. """
+        stat = self.path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            try:
+                rows = conn.execute(
+                    "SELECT columna, valor FROM categorias ORDER BY columna, posicion"
+                ).fetchall()
+            finally:
+                conn.close()
+            categories: dict[str, list] = {}
+            for col, value in rows:
+                categories.setdefault(col, []).append(value)
+            self._categories = categories
+            self._terms = None
+            self._signature = signature
+            self.version += 1
+
+    def changed(self) -> bool:
+        """ Indica si el fichero ha cambiado desde la última lectura, sin leerlo. """
+        if self._signature is None:
+            return False
+        stat = self.path.stat()
+        return (stat.st_mtime_ns, stat.st_size) != self._signature
+
+    def _connection(self) -> sqlite3.Connection:
+        """ Obtiene la conexión de solo lectura del hilo actual al fichero actual. """
+        self._check()
+        local = self._local
+        if getattr(local, "signature", None) != self._signature:
+            if getattr(local, "conn", None) is not None:
+                local.conn.close()
+            local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            local.signature = self._signature
+        return local.conn
+
+    def get_version(self) -> int:
+        """ Obtiene la versión de la base de datos, que cambia cada vez que se reescribe. """
+        self._check()
+        return self.version
+
+    def _query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        """ Ejecuta una consulta y convierte el resultado a los tipos del cubo en memoria. """
+        df = pd.read_sql_query(sql, self._connection(), params=params)
+        dtypes = cube_dtypes | band_dtypes
+        df = df.astype({col: dtype for col, dtype in dtypes.items() if col in df})
+        if "Fecha" in df:
+            df["Fecha"] = df["Fecha"].astype("datetime64[ns]")
+        for col, categories in self._categories.items():
+            if col in df:
+                df[col] = pd.Categorical(
+                    df[col], categories=categories, ordered=col in ordered_categories
+                )
+        return df
+
+    def filter_cube(
+        self,
+        date: datetime,
+        category: str = "General",
+        selected: str = "General",
+        by: list[str] | None = None,
+        table: str = "cubo",
+    ) -> pd.DataFrame | None:
+        """ Obtiene las filas del cubo posteriores a la fecha con la categoría seleccionada.
+        Con by, el cubo se agrega en la consulta a esas claves y solo llegan sus totales. """
+        start = int(np.datetime64(date, "ns").astype("int64"))
+        where, params = "Fecha >= ?", (start,)
+        if selected != "General":
+            if category not in category_cols:
+                return None
+            where, params = f"{_quote(category)} = ? AND Fecha >= ?", (selected, start)
+        if by is None:
+            return self._query(f"SELECT * FROM {table} WHERE {where} ORDER BY rowid", params)
+        keys = ", ".join(_quote(key) for key in by)
+        totals = ", ".join(
+            f"SUM({_quote(col)}) AS {_quote(col)}" for col in table_dtypes[table]
+        )
+        return self._query(
+            f"SELECT {keys}, {totals} FROM {table} WHERE {where} GROUP BY {keys} ORDER BY {keys}",
+            params,
+        )
+
+    def terms(self) -> pd.DataFrame:
+        """ Obtiene el resumen del cubo por trimestre y nivel, como cube.term_cube. """
+        self._check()
+        terms = self._terms
+        if terms is None:
+            keys = ", ".join(_quote(key) for key in term_keys)
+            totals = ", ".join(f"SUM({_quote(col)}) AS {_quote(col)}" for col in cube_dtypes)
+            terms = self._query(
+                f"SELECT {keys}, {totals} FROM cubo GROUP BY {keys} ORDER BY {keys}"
+            )
+            self._terms = terms
+        return terms
+
+    def categories(self, col: str) -> list:
+        """ Obtiene los valores de una columna categórica en su orden. """
+        self._check()
+        return list(self._categories.get(col, []))
+
+
+if __name__ == "__main__":
+    # Uso: python sqlstore.py [dataset.csv] [dataset.db]
+    app_dir = Path(__file__).parent
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else app_dir / "dataset.csv"
+    dst = Path(sys.argv[2]) if len(sys.argv) > 2 else src.with_suffix(".db")
+    write_database(src, dst)
+    print(f"Base de datos escrita en {dst}")
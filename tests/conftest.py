@@ -0,0 +1,17 @@
+import pytest
+
+import shared
+from data_gen_v2 import generar_alumnos_vectorizado
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    """ Dataset sintético en un CSV propio, con las cachés derivadas vacías. """
+    df = generar_alumnos_vectorizado(1, 2000, seed=0)
+    monkeypatch.setattr(
+        shared, "_dataset", shared.DatasetCache(tmp_path / "dataset.csv", tmp_path / "dataset.snapshot")
+    )
+    for cache in (shared._cube, shared._terms, shared._cohorts, shared._band):
+        monkeypatch.setattr(cache, "_entry", None)
+    monkeypatch.setattr(shared, "_objectives", {})
+    return df, tmp_path / "dataset.csv"
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared
+from chart_data import comparativa_series
+from cube import term_keys
+from plot_utils import mean_table
+
+
+@pytest.mark.parametrize("category", ["Curso", "Asignatura", "Instrumento"])
+def test_comparativa_band_matches_band_card(dataset, category):
+    df, path = dataset
+    df.to_csv(path, index=False)
+    # Un solo trimestre: la tarjeta de la banda de cada selección tiene un único valor
+    start = pd.Timestamp(shared.load_cube()["Fecha"].max()).to_pydatetime()
+
+    period = shared.load_filtered(start, by=shared.period_keys(category), band=True)
+    (traces,) = comparativa_series(period, category, "Acceso a banda")  # type: ignore
+
+    for x, y in zip(traces["x"], traces["y"]):
+        # Como band_table en app.py, con la selección de la barra
+        card = shared.load_filtered(start, category, x, by=term_keys, band=True)
+        values = mean_table(card, ["Acceso_Banda"])["Acceso_Banda"].dropna()  # type: ignore
+        assert len(values) == 1
+        np.testing.assert_allclose(y, values.iloc[0])
@@ -0,0 +1,99 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import shared
+from cohort import band_cube, build_cohorts
+from cube import build_cube, cube_keys, term_cube, term_keys
+from snapshot import read_csv
+
+splits = ["ultimo_trimestre", "desordenado"]
+
+
+def split_batch(df: pd.DataFrame, split: str) -> pd.Series:
+    """ Indica las filas que forman el lote: el último trimestre o filas sueltas de cualquiera. """
+    if split == "ultimo_trimestre":
+        fechas = pd.to_datetime(df["Fecha"].astype(str))
+        return fechas == fechas.max()
+    # Filas sueltas de cualquier trimestre: adelantan la primera banda de alumnos ya contados
+    return pd.Series(df.index % 5 == 0, index=df.index)
+
+
+def by_keys(cube: pd.DataFrame, keys: list[str] = cube_keys) -> pd.DataFrame:
+    """ Ordena las celdas de un cubo, que un lote añade al final sin reordenar. """
+    values = {key: cube[key].astype(str) for key in keys}
+    return cube.iloc[pd.DataFrame(values).sort_values(keys).index].reset_index(drop=True)
+
+
+def from_scratch() -> pd.DataFrame:
+    df = shared.load_dataset()
+    return band_cube(df, build_cohorts(df))
+
+
+@pytest.mark.parametrize("split", splits)
+def test_ingest_band_matches_rebuild(dataset, split):
+    df, path = dataset
+    is_batch = split_batch(df, split)
+    df[~is_batch].to_csv(path, index=False)
+    shared.load_band_index()
+
+    shared.ingest_batch(df[is_batch])
+
+    pd.testing.assert_frame_equal(
+        by_keys(shared.load_band_index().frame), by_keys(from_scratch()), check_categorical=False
+    )
+
+
+@pytest.mark.parametrize("split", splits)
+def test_ingest_cube_terms_and_objectives_match_rebuild(dataset, split):
+    df, path = dataset
+    is_batch = split_batch(df, split)
+    df[~is_batch].to_csv(path, index=False)
+    before = shared.load_objectives(date.today())
+    shared.load_terms()
+
+    shared.ingest_batch(df[is_batch])
+
+    cube = build_cube(shared.load_dataset())
+    terms = term_cube(cube)
+    pd.testing.assert_frame_equal(
+        by_keys(shared.load_cube()), by_keys(cube), check_categorical=False
+    )
+    pd.testing.assert_frame_equal(
+        by_keys(shared.load_terms(), term_keys), by_keys(terms, term_keys), check_categorical=False
+    )
+    after = shared.load_objectives(date.today())
+    assert after == pytest.approx(shared.compute_objectives(date.today(), terms))
+    assert after != before
+
+
+def test_ingest_persist_appends_to_csv(dataset):
+    df, path = dataset
+    is_batch = split_batch(df, "ultimo_trimestre")
+    df[~is_batch].to_csv(path, index=False)
+    shared.load_cube()
+
+    version = shared.ingest_batch(df[is_batch], persist=True)
+
+    # Lo añadido no cuenta como un cambio externo ni provoca una recarga
+    assert not shared._dataset.changed()
+    assert shared.dataset_version() == version
+    pd.testing.assert_frame_equal(
+        by_keys(build_cube(read_csv(path))), by_keys(shared.load_cube()), check_categorical=False
+    )
+
+
+def test_ingest_rejects_invalid_batch(dataset):
+    df, path = dataset
+    df.to_csv(path, index=False)
+    version = shared.dataset_version()
+    size = path.stat().st_size
+
+    with pytest.raises(ValueError):
+        shared.ingest_batch(df.drop(columns="Banda").head(10), persist=True)
+    with pytest.raises(ValueError):
+        shared.ingest_batch(df.head(10).assign(Trimestre=4), persist=True)
+
+    assert shared.dataset_version() == version
+    assert path.stat().st_size == size
@@ -0,0 +1,33 @@
+import mmap
+from pathlib import Path
+
+import numpy as np
+
+from data_gen_v2 import generar_alumnos_vectorizado
+from snapshot import apply_schema, read_snapshot, snapshot_meta, write_snapshot
+
+
+def mapped_file(values: np.ndarray) -> Path | None:
+    """ Obtiene el fichero mapeado en memoria del que es vista un array, si lo es. """
+    base = values
+    while base is not None:
+        if isinstance(base, np.memmap):
+            return Path(base.filename)  # type: ignore
+        if isinstance(base, mmap.mmap):
+            return None
+        base = getattr(base, "base", None)
+    return None
+
+
+def test_mmap_snapshot_shares_every_column(tmp_path):
+    df = apply_schema(generar_alumnos_vectorizado(1, 500, seed=0))
+    path = write_snapshot(df, tmp_path / "dataset.snapshot")
+
+    shared = read_snapshot(path, mmap=True)
+
+    for entry in snapshot_meta(path)["columns"]:
+        # Las categorías se comprueban en sus códigos, no en cat.codes, que es una copia
+        values = shared[entry["name"]].array._ndarray  # type: ignore
+        assert mapped_file(values) == path / entry["file"], entry["name"]
+        assert not values.flags.writeable
+    assert shared.equals(read_snapshot(path))
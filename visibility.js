@@ -0,0 +1,33 @@
+// Informa al servidor de qué gráficas de las tarjetas están a la vista, con el
+// input <output>_visible, para que solo se recalculen las que se ven
+(() => {
+  const onScreen = new Map();
+  // Tarjeta a pantalla completa, que oculta al resto
+  let fullScreen = null;
+
+  const report = (el) => {
+    const card = el.closest(".card");
+    const visible = onScreen.get(el) && (fullScreen === null || fullScreen === card);
+    if (el.dataset.visible === String(visible)) return;
+    el.dataset.visible = String(visible);
+    Shiny.setInputValue(`${el.id}_visible`, visible);
+  };
+
+  const observer = new IntersectionObserver((entries) => {
+    for (const entry of entries) {
+      onScreen.set(entry.target, entry.isIntersecting);
+      report(entry.target);
+    }
+  });
+
+  $(document).on("shiny:bound", (event) => {
+    if (event.bindingType === "output" && event.target.closest(".card")) {
+      observer.observe(event.target);
+    }
+  });
+
+  document.addEventListener("bslib.card", (event) => {
+    fullScreen = event.detail.fullScreen ? event.target.closest(".card") : null;
+    onScreen.forEach((_, el) => report(el));
+  });
+})();
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+from datetime import date
+
+from export import selection_views
+from metrics import register_stats
+from plot_utils import figure_cache
+from shared import dataset_version, last_entry_ds, load_objectives, view_key
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """ Precarga en segundo plano del dataset, los objetivos y la vista inicial del dashboard. """
+
+    def __init__(self):
+        self.state = "pendiente"
+        self.error: str | None = None
+        self.seconds = 0.0
+        self.figures = 0
+        self.ready = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """ Lanza la precarga en un hilo, una sola vez por proceso. """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def run(self) -> None:
+        """ Carga los datos y construye las figuras de la vista General del trimestre actual. """
+        start = time.perf_counter()
+        try:
+            self.state = "datos"
+            version = dataset_version()
+            self.state = "objetivos"
+            load_objectives(date.today())
+            self.state = "figuras"
+            trim, course = last_entry_ds(date.today())
+            # Las tablas y los objetivos se cargan después: son de la versión cargada o de
+            # una posterior, nunca de una anterior, como con versioned en app.py
+            versions = (version, version)
+            for chart, tipo, build in selection_views((trim, course), "General", "General"):
+                # Misma clave que figure_key en app.py, donde el trimestre llega como texto
+                key = view_key(chart, str(trim), course, "General", "General", versions, tipo)
+                figure_cache.get_or_build(key, build)
+                self.figures += 1
+        except Exception as e:
+            self.state, self.error = "error", repr(e)
+            logger.exception("La precarga ha fallado")
+            return
+        finally:
+            self.seconds = time.perf_counter() - start
+        self.state = "lista"
+        self.ready.set()
+        logger.info("Precarga lista en %.1f s (%d figuras)", self.seconds, self.figures)
+
+    def status(self) -> dict:
+        """ Obtiene el estado de la precarga para la sonda de disponibilidad. """
+        return {
+            "ready": self.ready.is_set(),
+            "state": self.state,
+            "error": self.error,
+            "seconds": round(self.seconds, 3),
+            "figures": self.figures,
+        }
+
+    def stats(self) -> dict[str, float]:
+        """ Obtiene el estado de la precarga como métricas. """
+        return {"ready": int(self.ready.is_set()), "seconds": self.seconds, "figures": self.figures}
+
+
+# Precarga del proceso, que lanza app.py al arrancar
+warmup = WarmUp()
+register_stats("dashboard_warmup", warmup.stats, "Precarga de la vista inicial al arrancar.")